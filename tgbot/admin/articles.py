@@ -2,12 +2,13 @@
 
 from django.contrib import admin
 
-from tgbot.models import ArticlesSection, ArticlesSubsection, Article
+from tgbot.models import ArticlesSection, ArticlesSubsection, Article, TelegraphPage
 
 
 class ArticleInline(admin.TabularInline):
     model = Article
     fields = ("title", "link")
+    readonly_fields = ("title",)
     extra = 1
     show_change_link = True
 
@@ -36,6 +37,17 @@ class ArticlesSectionAdmin(admin.ModelAdmin):
 
 @admin.register(Article)
 class ArticleAdmin(admin.ModelAdmin):
-    list_display = ("subsection", "link")
+    list_display = ("title", "subsection", "link")
     list_filter = ("subsection__section", "subsection")
-    search_fields = ("link",)
+    search_fields = ("title", "link")
+    readonly_fields = ("title",)
+    list_select_related = ("subsection__section",)
+
+
+@admin.register(TelegraphPage)
+class TelegraphPageAdmin(admin.ModelAdmin):
+    list_display = ("path", "title", "author_name", "views", "fetched_at")
+    search_fields = ("path", "title", "author_name")
+    readonly_fields = (
+        "path", "title", "author_name", "views", "content_hash", "etag", "last_modified", "fetched_at"
+    )
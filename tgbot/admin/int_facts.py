@@ -15,5 +15,6 @@ class DailySubscriptionAdmin(admin.ModelAdmin):
 @admin.register(InterestingFact)
 class InterestingFactAdmin(admin.ModelAdmin):
     list_display = ("__str__", "date_to_mailing", "link")
-    search_fields = ("link",)
+    search_fields = ("title", "link")
+    readonly_fields = ("title",)
     list_filter = ("date_to_mailing",)
\ No newline at end of file
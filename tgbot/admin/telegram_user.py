@@ -8,10 +8,11 @@ from telebot import TeleBot
 import telebot
 from django.urls import reverse
 
-from tgbot.models import TelegramUser, SentMessage
+from tgbot.models import TelegramUser, SentMessage, OutboxMessage
 from tgbot.forms import SendMessageForm
 from tgbot.logics.constants import Messages
 from tgbot.logics.administrator_actions import mass_mailing
+from tgbot.user_cache import user_cache
 
 @admin.register(TelegramUser)
 class TelegramUserAdmin(admin.ModelAdmin):
@@ -62,7 +63,10 @@ class TelegramUserAdmin(admin.ModelAdmin):
 
     @admin.action(description="Заблокировать пользователя(ей)")
     def block_users(self, request, queryset):
+        chat_ids = list(queryset.values_list('chat_id', flat=True))
         updated = queryset.update(blocked=True)
+        # update() не вызывает сигналы — сбрасываем кэш пользователей вручную
+        user_cache.invalidate(*chat_ids)
         self.message_user(
             request,
             f"Заблокировано {updated} пользователь(ей).",
@@ -71,7 +75,10 @@ class TelegramUserAdmin(admin.ModelAdmin):
 
     @admin.action(description="Разблокировать пользователя(ей)")
     def unblock_users(self, request, queryset):
+        chat_ids = list(queryset.values_list('chat_id', flat=True))
         updated = queryset.update(blocked=False)
+        # update() не вызывает сигналы — сбрасываем кэш пользователей вручную
+        user_cache.invalidate(*chat_ids)
         self.message_user(
             request,
             f"Разблокировано {updated} пользователь(ей).",
@@ -144,3 +151,24 @@ class SentMessageAdmin(admin.ModelAdmin):
     list_display = ('id', 'message_id', 'telegram_user', 'created_at')
     search_fields = ('message_id', 'telegram_user__chat_id', 'telegram_user__username')
     list_filter = ('telegram_user', 'created_at')
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'action', 'idempotency_key', 'status', 'attempts', 'created_at', 'sent_at')
+    search_fields = ('idempotency_key', 'action')
+    list_filter = ('status', 'action', 'created_at')
+    readonly_fields = ('created_at', 'sent_at')
+    actions = ['retry_messages']
+
+    @admin.action(description="Отправить повторно")
+    def retry_messages(self, request, queryset):
+        from django.utils import timezone
+        updated = queryset.exclude(status=OutboxMessage.STATUS_SENT).update(
+            status=OutboxMessage.STATUS_PENDING, attempts=0, available_at=timezone.now()
+        )
+        self.message_user(
+            request,
+            f"Поставлено на повторную отправку {updated} сообщение(й).",
+            level=messages.SUCCESS
+        )
@@ -0,0 +1,95 @@
+import threading
+
+from django_redis import get_redis_connection
+
+from tgbot.models import TelegramUser
+from tgbot.logics.constants import Constants
+from tgbot.write_behind import WriteBehindBuffer
+
+from pathlib import Path
+from loguru import logger
+
+Path("logs").mkdir(parents=True, exist_ok=True)
+
+log_filename = Path("logs") / f"{Path(__file__).stem}.log"
+logger.add(str(log_filename), rotation="10 MB", level="INFO")
+
+
+class BlockedChats:
+    """
+    Обновление TelegramUser.bot_was_blocked по результатам отправок без
+    обращения к БД на пути отправки: изменения флага копятся и записываются
+    пачкой — по одному UPDATE ... WHERE chat_id IN (...) на каждое значение,
+    причём строки, где флаг уже такой, не трогаются.
+
+    При Constants.BLOCKED_CHATS_REDIS множество заблокировавших бота чатов
+    общее для всех воркеров и лежит в Redis (один раз заполняется из БД):
+    запись в БД ставится в очередь, только если SADD/SREM действительно
+    изменили множество. Без Redis запись ставится в очередь всегда —
+    у отдельного процесса нет достоверного знания о текущем флаге.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seeded = False
+        self._writes = WriteBehindBuffer(
+            "blocked_chats", self._flush, Constants.BLOCKED_CHATS_FLUSH_INTERVAL
+        )
+
+    @property
+    def _seeded_key(self) -> str:
+        return f"{Constants.BLOCKED_CHATS_KEY}:seeded"
+
+    def _redis(self):
+        if not Constants.BLOCKED_CHATS_REDIS:
+            return None
+        redis_conn = get_redis_connection("default")
+        if not self._seeded:
+            with self._lock:
+                if not self._seeded:
+                    self._seed(redis_conn)
+                    self._seeded = True
+        return redis_conn
+
+    def _seed(self, redis_conn):
+        # пустое множество Redis не хранит, поэтому факт заполнения — отдельный ключ
+        if redis_conn.exists(self._seeded_key):
+            return
+        ids = list(TelegramUser.objects.filter(bot_was_blocked=True).values_list("chat_id", flat=True))
+        if ids:
+            redis_conn.sadd(Constants.BLOCKED_CHATS_KEY, *ids)
+        redis_conn.set(self._seeded_key, 1)
+        logger.info(f"BlockedChats: в Redis загружено {len(ids)} chat_id из БД")
+
+    def mark_blocked(self, chat_id: int):
+        self._set(chat_id, True)
+
+    def mark_unblocked(self, chat_id: int):
+        self._set(chat_id, False)
+
+    def _set(self, chat_id: int, blocked: bool):
+        try:
+            redis_conn = self._redis()
+            if redis_conn is not None:
+                key = Constants.BLOCKED_CHATS_KEY
+                changed = redis_conn.sadd(key, chat_id) if blocked else redis_conn.srem(key, chat_id)
+                if not changed:
+                    return
+        except Exception as e:
+            # без Redis не знаем, изменился ли флаг, — запишем в любом случае
+            logger.warning(f"BlockedChats: Redis недоступен, chat_id={chat_id} пишем в БД: {e}")
+        self._writes.put(chat_id, blocked)
+        if blocked or Constants.BLOCKED_CHATS_REDIS:
+            logger.info(f"BlockedChats: chat_id={chat_id} bot_was_blocked={blocked}")
+
+    @staticmethod
+    def _flush(items: dict[int, bool]):
+        blocked = [chat_id for chat_id, flag in items.items() if flag]
+        unblocked = [chat_id for chat_id, flag in items.items() if not flag]
+        if blocked:
+            TelegramUser.objects.filter(chat_id__in=blocked, bot_was_blocked=False).update(bot_was_blocked=True)
+        if unblocked:
+            TelegramUser.objects.filter(chat_id__in=unblocked, bot_was_blocked=True).update(bot_was_blocked=False)
+
+
+blocked_chats = BlockedChats()
@@ -0,0 +1,118 @@
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+
+from tgbot import content_version
+from tgbot.models import Article, ArticlesSection, ArticlesSubsection, Quiz, QuizLevel, QuizTopic
+
+from pathlib import Path
+from loguru import logger
+
+Path("logs").mkdir(parents=True, exist_ok=True)
+
+log_filename = Path("logs") / f"{Path(__file__).stem}.log"
+logger.add(str(log_filename), rotation="10 MB", level="INFO")
+
+
+# Узлы каталога: неизменяемые копии строк БД, связи — через id
+SectionNode = namedtuple("SectionNode", ("id", "title", "subsection_ids"))
+SubsectionNode = namedtuple("SubsectionNode", ("id", "title", "section_id", "articles"))
+ArticleNode = namedtuple("ArticleNode", ("id", "title", "link"))
+TopicNode = namedtuple("TopicNode", ("id", "title", "level_ids"))
+LevelNode = namedtuple("LevelNode", ("id", "title"))
+QuizNode = namedtuple("QuizNode", ("id", "title", "topic_id", "level_id"))
+
+
+class Catalog:
+    """
+    Снимок контента для навигации: разделы → подразделы → статьи
+    и темы → уровни → квизы. Поиск по id — словари, порядок — кортежи id.
+    После построения не меняется: читать можно из любого потока без блокировок.
+    """
+
+    __slots__ = ("version", "sections", "section_ids", "subsections",
+                 "topics", "topic_ids", "levels", "quizzes", "_quiz_ids")
+
+    def __init__(self, version: int | None):
+        self.version = version
+
+        subsection_ids: dict[int, list[int]] = {}
+        articles: dict[int, list[ArticleNode]] = {}
+        for pk, title, link, subsection_id in Article.objects.order_by("pk").values_list(
+                "pk", "title", "link", "subsection_id"):
+            articles.setdefault(subsection_id, []).append(ArticleNode(pk, title, link))
+
+        subsections = {}
+        for pk, title, section_id in ArticlesSubsection.objects.order_by("pk").values_list(
+                "pk", "title", "section_id"):
+            subsections[pk] = SubsectionNode(pk, title, section_id, tuple(articles.get(pk, ())))
+            subsection_ids.setdefault(section_id, []).append(pk)
+
+        sections = {
+            pk: SectionNode(pk, title, tuple(subsection_ids.get(pk, ())))
+            for pk, title in ArticlesSection.objects.order_by("pk").values_list("pk", "title")
+        }
+
+        quizzes = {}
+        quiz_ids: dict[tuple, list[int]] = {}
+        level_ids: dict[int, set[int]] = {}
+        for pk, title, topic_id, level_id in Quiz.objects.order_by("pk").values_list(
+                "pk", "title", "topic_id", "level_id"):
+            quizzes[pk] = QuizNode(pk, title, topic_id, level_id)
+            quiz_ids.setdefault((topic_id, level_id), []).append(pk)
+            if level_id is not None:
+                level_ids.setdefault(topic_id, set()).add(level_id)
+
+        levels = {pk: LevelNode(pk, title) for pk, title in QuizLevel.objects.order_by("pk").values_list("pk", "title")}
+        topics = {
+            pk: TopicNode(pk, title, tuple(sorted(level_ids.get(pk, ()))))
+            for pk, title in QuizTopic.objects.order_by("pk").values_list("pk", "title")
+        }
+
+        self.sections = MappingProxyType(sections)
+        self.section_ids = tuple(sections)
+        self.subsections = MappingProxyType(subsections)
+        self.topics = MappingProxyType(topics)
+        self.topic_ids = tuple(topics)
+        self.levels = MappingProxyType(levels)
+        self.quizzes = MappingProxyType(quizzes)
+        self._quiz_ids = MappingProxyType({key: tuple(ids) for key, ids in quiz_ids.items()})
+
+    def quiz_ids(self, topic_id: int, level_id: int) -> tuple[int, ...]:
+        """id квизов темы topic_id уровня level_id."""
+        return self._quiz_ids.get((topic_id, level_id), ())
+
+
+class CatalogStore:
+    """
+    Хранит текущий Catalog процесса.
+
+    Снимок строится один раз и заменяется целиком (одним присваиванием),
+    когда меняется версия контента в Redis (tgbot/content_version.py,
+    её увеличивают signals). Проверка версии — один GET в Redis;
+    если Redis недоступен, используется уже загруженный снимок.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._catalog: Catalog | None = None
+
+    def get(self) -> Catalog:
+        version = content_version.current()
+        catalog = self._catalog
+        if catalog is not None and (version is None or version == catalog.version):
+            return catalog
+        with self._lock:
+            catalog = self._catalog
+            if catalog is None or (version is not None and version != catalog.version):
+                # версия читается до загрузки: правка во время загрузки снова сменит версию
+                catalog = Catalog(version)
+                self._catalog = catalog
+                logger.info(
+                    f"CatalogStore: загружен каталог версии {version}: "
+                    f"{len(catalog.sections)} разделов, {len(catalog.topics)} тем, {len(catalog.quizzes)} квизов"
+                )
+            return catalog
+
+
+catalog_store = CatalogStore()
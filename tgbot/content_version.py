@@ -0,0 +1,34 @@
+from django_redis import get_redis_connection
+
+from tgbot.logics.constants import Constants
+
+from pathlib import Path
+from loguru import logger
+
+Path("logs").mkdir(parents=True, exist_ok=True)
+
+log_filename = Path("logs") / f"{Path(__file__).stem}.log"
+logger.add(str(log_filename), rotation="10 MB", level="INFO")
+
+
+def current() -> int | None:
+    """
+    Текущая версия контента (разделы и статьи, квизы, глоссарий) — общий для
+    всех воркеров счётчик в Redis. None — Redis недоступен, кэшам верить нельзя.
+    """
+    try:
+        raw = get_redis_connection("default").get(Constants.CONTENT_VERSION_KEY)
+    except Exception as e:
+        logger.warning(f"content_version: Redis недоступен: {e}")
+        return None
+    return int(raw or 0)
+
+
+def bump():
+    """Контент изменился: кэши, построенные по старой версии, больше не используются."""
+    try:
+        version = get_redis_connection("default").incr(Constants.CONTENT_VERSION_KEY)
+    except Exception as e:
+        logger.error(f"content_version: не удалось увеличить версию: {e}")
+        return
+    logger.info(f"content_version: версия контента {version}")
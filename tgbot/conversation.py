@@ -0,0 +1,68 @@
+import json
+
+from django_redis import get_redis_connection
+
+from tgbot.logics.constants import Constants
+
+from pathlib import Path
+from loguru import logger
+
+Path("logs").mkdir(parents=True, exist_ok=True)
+
+log_filename = Path("logs") / f"{Path(__file__).stem}.log"
+logger.add(str(log_filename), rotation="10 MB", level="INFO")
+
+
+class ConversationState:
+    """
+    Ожидаемый шаг ввода по чатам — замена register_next_step_handler telebot.
+
+    telebot держит шаги в памяти процесса: при нескольких воркерах ответ
+    пользователя может прийти в другой воркер, а шаги тех, кто так и не ответил,
+    копятся бесконечно. Здесь шаг хранится в Redis одним ключом на чат
+    ({"step": имя, "data": {...}}) с TTL CONVERSATION_TTL, поэтому
+    проверка входящего сообщения — один запрос, а память ограничена.
+
+    Шаг забирается атомарно (take): одно сообщение обработает ровно один воркер.
+    Если Redis недоступен, шаг теряется — пользователь просто повторит действие.
+    """
+
+    def __init__(self, bot_id: str):
+        self._bot_id = bot_id
+
+    def _key(self, chat_id: int) -> str:
+        return f"{Constants.CONVERSATION_PREFIX}:{self._bot_id}:{chat_id}"
+
+    def set(self, chat_id: int, step: str, **data):
+        """Следующее текстовое сообщение чата обработает шаг step; data — его параметры (JSON)."""
+        raw = json.dumps({"step": step, "data": data})
+        try:
+            get_redis_connection("default").set(self._key(chat_id), raw, ex=Constants.CONVERSATION_TTL)
+        except Exception as e:
+            logger.warning(f"ConversationState: не удалось сохранить шаг {step} chat_id={chat_id}: {e}")
+
+    def clear(self, chat_id: int):
+        try:
+            get_redis_connection("default").delete(self._key(chat_id))
+        except Exception as e:
+            logger.warning(f"ConversationState: не удалось сбросить шаг chat_id={chat_id}: {e}")
+
+    def take(self, chat_id: int) -> tuple[str, dict] | None:
+        """
+        Забирает (step, data) ожидаемого шага и удаляет его; None — шага нет.
+        """
+        key = self._key(chat_id)
+        try:
+            pipe = get_redis_connection("default").pipeline(transaction=True)
+            raw, _ = pipe.get(key).delete(key).execute()
+        except Exception as e:
+            logger.warning(f"ConversationState: Redis недоступен, шаг chat_id={chat_id} не проверен: {e}")
+            return None
+        if raw is None:
+            return None
+        try:
+            state = json.loads(raw)
+            return state["step"], state.get("data") or {}
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error(f"ConversationState: повреждённый шаг chat_id={chat_id}: {e}")
+            return None
@@ -4,7 +4,9 @@ import logging
 from pathlib import Path
 
 from tgbot.syncbot import SyncBot
+from tgbot.transport import install_transport
 from tgbot.models import Configuration, TelegramBotToken
+from tgbot.logics.constants import Constants
 
 # Настраиваем логгирование dispatcher’а
 Path("logs").mkdir(parents=True, exist_ok=True)
@@ -30,7 +32,11 @@ def _initialize_bot(token: str) -> SyncBot:
     регистрирует у него все команды из tgbot.logics.commands.init_bot_commands.
     """
     logger.debug(f"_initialize_bot: вход с токеном, оканчивающимся на …{token[-6:]}")
-    bot = SyncBot(token)
+    # пул соединений на оба бота (основной и тестовый) плюс запас на служебные вызовы
+    install_transport(pool_size=Constants.OUTBOUND_WORKERS * 2 + 2)
+    # handlers выполняются прямо в потоке UpdateWorkerPool: он сам держит
+    # порядок апдейтов внутри чата, собственный пул telebot его бы нарушил
+    bot = SyncBot(token, threaded=False, outbound_workers=Constants.OUTBOUND_WORKERS)
     try:
         # Импортируем и устанавливаем команды именно здесь, когда бот уже создан
         from tgbot.logics.commands import init_bot_commands
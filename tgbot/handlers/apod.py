@@ -6,7 +6,7 @@ from tgbot.logics.apod_api import APODClient, APODClientError
 from tgbot.models import ApodFile, ApodApiKey
 from tgbot.logics.constants import CallbackData, Messages
 from tgbot.dispatcher import get_main_bot
-from tgbot.logics.user_helper import get_user_from_call, get_callback_name_from_call
+from tgbot.logics.user_helper import get_user_from_call
 from tgbot.logics.messages import SendMessages
 from pathlib import Path
 from loguru import logger
@@ -28,7 +28,7 @@ logger.add(
 
 bot = get_main_bot()
 
-@bot.callback_query_handler(func=lambda call: get_callback_name_from_call(call) == CallbackData.APOD)
+@bot.callback_route(CallbackData.APOD)
 def handle_apod(call: CallbackQuery):
     logger.info("Received APOD callback: {}", call.data)
     user = get_user_from_call(call)
@@ -38,7 +38,7 @@ def handle_apod(call: CallbackQuery):
 
     try:
         logger.debug("Invoking SendMessages.Apod.send_apod for user {}", user.id)
-        bot.answer_callback_query(call.id, Messages.APOD_NOTIFICATION)
+        bot.answer_callback_query_async(call.id, Messages.APOD_NOTIFICATION)
         SendMessages.Apod.send_apod(user)
         logger.info("APOD sent successfully to user {}", user.id)
     except APODClientError as e:
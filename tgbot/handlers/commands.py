@@ -24,9 +24,11 @@ def handle_start(message: Message):
     logger.debug("Message details: chat: {}, from_user: {}, text: {}",
                  message.chat, message.from_user, message.text)
     try:
-        # Синхронизация данных пользователя
-        user, created = sync_user_data(message)
-        logger.info("sync_user_data result for chat_id={}: created={}", message.chat.id, created)
+        # Пользователь уже синхронизирован в SyncBot.process_new_updates
+        user = getattr(message, "astro_user", None)
+        if user is None:
+            user, created = sync_user_data(message)
+            logger.info("sync_user_data result for chat_id={}: created={}", message.chat.id, created)
 
         # Отправка главного меню
         logger.debug("Sending main menu to user_id={}, forced_delete=True", user.id)
@@ -2,10 +2,10 @@ import datetime
 from typing import Union
 from telebot.types import CallbackQuery, Message
 from tgbot.dispatcher import get_main_bot
-from tgbot.logics.constants import ButtonNames, CallbackData, Messages
+from tgbot.logics.constants import ButtonNames, CallbackData, Messages, Steps
 from tgbot.logics.messages import SendMessages
 from tgbot.models import ArticlesSection, ArticlesSubsection, DailySubscription, QuizTopic, QuizLevel, Quiz, TelegramUser
-from tgbot.logics.user_helper import get_user_from_call, extract_query_params, extract_int_param, get_callback_name_from_call
+from tgbot.logics.user_helper import get_user_from_call, extract_query_params, extract_int_param
 from pathlib import Path
 from loguru import logger
 
@@ -19,7 +19,7 @@ logger.add(str(log_filename), rotation="10 MB", level="DEBUG")
 bot = get_main_bot()
 
 
-@bot.callback_query_handler(func=lambda call: get_callback_name_from_call(call) == CallbackData.INT_FACTS)
+@bot.callback_route(CallbackData.INT_FACTS)
 def handle_int_facts(call: CallbackQuery):
     logger.info("Received INT_FACTS callback: {}", call.data)
     user = get_user_from_call(call)
@@ -29,7 +29,7 @@ def handle_int_facts(call: CallbackQuery):
     logger.debug("Sending IntFacts menu to user {}", user.id)
     SendMessages.IntFacts.menu(user)
 
-@bot.callback_query_handler(func=lambda call: get_callback_name_from_call(call) == CallbackData.INT_FACTS_TODAY)
+@bot.callback_route(CallbackData.INT_FACTS_TODAY)
 def handle_int_facts_today(call: CallbackQuery):
     logger.info("Received INT_FACTS_TODAY callback: {}", call.data)
     user = get_user_from_call(call)
@@ -39,7 +39,7 @@ def handle_int_facts_today(call: CallbackQuery):
     logger.debug("Sending today's fact to user {}", user.id)
     SendMessages.IntFacts.today(user)
 
-@bot.callback_query_handler(func=lambda call: get_callback_name_from_call(call) == CallbackData.INT_FACTS_SUB)
+@bot.callback_route(CallbackData.INT_FACTS_SUB)
 def handle_int_facts_sub(call: CallbackQuery):
     logger.info("Received INT_FACTS_SUB callback: {}", call.data)
     user = get_user_from_call(call)
@@ -49,7 +49,7 @@ def handle_int_facts_sub(call: CallbackQuery):
     logger.debug("Prompting user {} to choose subscription time or default", user.id)
     SendMessages.IntFacts.choose_time_or_default(user)
 
-@bot.callback_query_handler(func=lambda call: get_callback_name_from_call(call) == CallbackData.INT_FACTS_UNSUB)
+@bot.callback_route(CallbackData.INT_FACTS_UNSUB)
 def handle_int_facts_unsub(call: CallbackQuery):
     logger.info("Received INT_FACTS_UNSUB callback: {}", call.data)
     user = get_user_from_call(call)
@@ -65,7 +65,7 @@ def handle_int_facts_unsub(call: CallbackQuery):
         logger.debug("No DailySubscription entries found for user {} to delete", user.id)
     SendMessages.IntFacts.unsub(user)
 
-@bot.callback_query_handler(func=lambda call: get_callback_name_from_call(call) == CallbackData.INT_FACTS_DEFAULT_TIME)
+@bot.callback_route(CallbackData.INT_FACTS_DEFAULT_TIME)
 def handle_int_facts_default_time(call: CallbackQuery):
     logger.info("Received INT_FACTS_DEFAULT_TIME callback: {}", call.data)
     user = get_user_from_call(call)
@@ -75,7 +75,7 @@ def handle_int_facts_default_time(call: CallbackQuery):
     logger.debug("Using default subscription time for user {}", user.id)
     process_int_facts_time_sub(ButtonNames.INT_FACTS_DEFAULT_TIME, user)
 
-@bot.callback_query_handler(func=lambda call: get_callback_name_from_call(call) == CallbackData.INT_FACTS_ENTER_TIME)
+@bot.callback_route(CallbackData.INT_FACTS_ENTER_TIME)
 def handle_int_facts_enter_time(call: CallbackQuery):
     logger.info("Received INT_FACTS_ENTER_TIME callback: {}", call.data)
     user = get_user_from_call(call)
@@ -83,14 +83,15 @@ def handle_int_facts_enter_time(call: CallbackQuery):
         logger.warning("User not found for INT_FACTS_ENTER_TIME call: {}", call.data)
         return
     logger.debug("Prompting user {} to enter custom time", user.id)
-    sent = SendMessages.IntFacts.enter_time(user)
-    bot.register_next_step_handler(sent, process_int_facts_time_sub, user)
+    SendMessages.IntFacts.enter_time(user)
+    bot.set_step(user.chat_id, Steps.INT_FACTS_TIME)
 
 
+@bot.step_handler(Steps.INT_FACTS_TIME)
 def process_int_facts_time_sub(input_data: Union[str, Message], user: TelegramUser):
     # Получаем текст из Message или из переданной строки
     if isinstance(input_data, Message):
-        text = input_data.text.strip()
+        text = (input_data.text or "").strip()
     else:
         text = input_data.strip()
     logger.info("User {} provided time input: {}", user.id, text)
@@ -99,9 +100,9 @@ def process_int_facts_time_sub(input_data: Union[str, Message], user: TelegramUs
         logger.debug("Parsed time {} for user {}", selected_time, user.id)
     except ValueError:
         logger.error("Failed to parse time '{}' for user {}", text, user.id)
-        sent = SendMessages.IntFacts.incorrect_enter_time(user)
+        SendMessages.IntFacts.incorrect_enter_time(user)
         logger.debug("Prompting user {} to re-enter time", user.id)
-        bot.register_next_step_handler(sent, process_int_facts_time_sub, user)
+        bot.set_step(user.chat_id, Steps.INT_FACTS_TIME)
         return
 
     # Создаём или обновляем подписку
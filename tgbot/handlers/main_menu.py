@@ -2,7 +2,7 @@ from telebot.types import CallbackQuery
 from tgbot.dispatcher import get_main_bot
 from tgbot.models import UserQuizSession
 from tgbot.logics.constants import CallbackData, Messages
-from tgbot.logics.user_helper import get_user_from_call, extract_query_params, extract_int_param, get_callback_name_from_call
+from tgbot.logics.user_helper import get_user_from_call, extract_query_params, extract_int_param
 from tgbot.logics.messages import SendMessages
 from pathlib import Path
 from loguru import logger
@@ -17,7 +17,7 @@ logger.add(str(log_filename), rotation="10 MB", level="DEBUG")
 bot = get_main_bot()
 
 # Обработчик для главного меню
-@bot.callback_query_handler(func=lambda call: get_callback_name_from_call(call) == CallbackData.MENU)
+@bot.callback_route(CallbackData.MENU)
 def main_menu(call: CallbackQuery):
     logger.info("Received MENU callback: {}", call.data)
     user = get_user_from_call(call)
@@ -46,7 +46,7 @@ def main_menu(call: CallbackQuery):
     SendMessages.MainMenu.menu(user)
 
 # Обработчик для принудительного удаления сессии и показа меню
-@bot.callback_query_handler(func=lambda call: get_callback_name_from_call(call) == CallbackData.MENU_FORCED_DELETE)
+@bot.callback_route(CallbackData.MENU_FORCED_DELETE)
 def main_menu_forced_delete(call: CallbackQuery):
     logger.info("Received MENU_FORCED_DELETE callback: {}", call.data)
     user = get_user_from_call(call)
@@ -1,8 +1,8 @@
 import datetime
 from telebot.types import CallbackQuery
 from tgbot.dispatcher import get_main_bot
-from tgbot.logics.constants import CallbackData, Messages
-from tgbot.logics.user_helper import get_user_from_call, extract_query_params, extract_int_param, get_callback_name_from_call
+from tgbot.logics.constants import CallbackData, Messages, Steps
+from tgbot.logics.user_helper import get_user_from_call, extract_query_params, extract_int_param
 from tgbot.logics.messages import SendMessages
 from tgbot.models import TelegramUser
 from pathlib import Path
@@ -18,7 +18,7 @@ logger.add(str(log_filename), rotation="10 MB", level="DEBUG")
 bot = get_main_bot()
 
 # Обработчик для MOON_CALC (главное меню MoonCalc)
-@bot.callback_query_handler(func=lambda call: get_callback_name_from_call(call) == CallbackData.MOON_CALC)
+@bot.callback_route(CallbackData.MOON_CALC)
 def handle_moon_calc(call: CallbackQuery):
     logger.info("Received MOON_CALC callback: {}", call.data)
     user = get_user_from_call(call)
@@ -29,7 +29,7 @@ def handle_moon_calc(call: CallbackQuery):
     SendMessages.MoonCalc.menu(user)
 
 # Обработчик для MOON_CALC_TODAY
-@bot.callback_query_handler(func=lambda call: get_callback_name_from_call(call) == CallbackData.MOON_CALC_TODAY)
+@bot.callback_route(CallbackData.MOON_CALC_TODAY)
 def handle_moon_calc_today(call: CallbackQuery):
     logger.info("Received MOON_CALC_TODAY callback: {}", call.data)
     user = get_user_from_call(call)
@@ -40,7 +40,7 @@ def handle_moon_calc_today(call: CallbackQuery):
     SendMessages.MoonCalc.today(user)
 
 # Обработчик для MOON_CALC_ENTER_DATE
-@bot.callback_query_handler(func=lambda call: get_callback_name_from_call(call) == CallbackData.MOON_CALC_ENTER_DATE)
+@bot.callback_route(CallbackData.MOON_CALC_ENTER_DATE)
 def handle_moon_calc_enter_date(call: CallbackQuery):
     logger.info("Received MOON_CALC_ENTER_DATE callback: {}", call.data)
     user = get_user_from_call(call)
@@ -48,17 +48,18 @@ def handle_moon_calc_enter_date(call: CallbackQuery):
         logger.warning("User not found for MOON_CALC_ENTER_DATE call: {}", call.data)
         return
     logger.debug("Prompting user {} to enter date", user.id)
-    sent = SendMessages.MoonCalc.enter_date(user)
-    bot.register_next_step_handler(sent, process_moon_date, user)
+    SendMessages.MoonCalc.enter_date(user)
+    bot.set_step(user.chat_id, Steps.MOON_CALC_DATE)
 
 
+@bot.step_handler(Steps.MOON_CALC_DATE)
 def process_moon_date(message, user: TelegramUser):
     """
     Обрабатывает ответ пользователя на запрос даты.
     Парсит дату и вызывает SendMessages.MoonCalc.date.
     Если формат некорректный, просит ввести снова.
     """
-    text = message.text.strip()
+    text = (message.text or "").strip()
     logger.info("User {} entered date text: '{}'", user.id, text)
     try:
         # Парсим строку в datetime; при неверном формате выбросит ValueError
@@ -66,9 +67,9 @@ def process_moon_date(message, user: TelegramUser):
         logger.debug("Parsed date {} for user {}", dt, user.id)
     except ValueError:
         logger.error("Failed to parse date '{}' for user {}", text, user.id)
-        sent = SendMessages.MoonCalc.incorrect_enter_date(user)
+        SendMessages.MoonCalc.incorrect_enter_date(user)
         logger.debug("Prompting user {} to re-enter date", user.id)
-        bot.register_next_step_handler(sent, process_moon_date, user)
+        bot.set_step(user.chat_id, Steps.MOON_CALC_DATE)
         return
 
     logger.info("Processing moon data for user {} on date {}", user.id, dt)
@@ -2,8 +2,9 @@ from telebot.types import CallbackQuery
 from tgbot.dispatcher import get_main_bot
 from tgbot.logics.messages import SendMessages
 from tgbot.logics.constants import CallbackData, Messages
-from tgbot.models import ArticlesSection, ArticlesSubsection, Choice, QuizTopic, QuizLevel, Quiz, UserQuizAnswer, UserQuizSession
-from tgbot.logics.user_helper import get_user_from_call, extract_query_params, extract_int_param, get_callback_name_from_call
+from tgbot.models import Choice, Question, UserQuizAnswer, UserQuizSession
+from tgbot.catalog import catalog_store
+from tgbot.logics.user_helper import get_user_from_call, extract_query_params, extract_int_param
 from pathlib import Path
 from loguru import logger
 
@@ -17,7 +18,7 @@ logger.add(str(log_filename), rotation="10 MB", level="DEBUG")
 bot = get_main_bot()
 
 # --- Обработчики QUIZZES ---
-@bot.callback_query_handler(func=lambda call: get_callback_name_from_call(call) == CallbackData.QUIZZES)
+@bot.callback_route(CallbackData.QUIZZES)
 def handle_quizzes(call: CallbackQuery):
     logger.info("Received QUIZZES callback: {}", call.data)
     user = get_user_from_call(call)
@@ -27,7 +28,7 @@ def handle_quizzes(call: CallbackQuery):
     logger.debug("Sending topic list to user {}", user.id)
     SendMessages.Quizzes.choose_topic(user)
 
-@bot.callback_query_handler(func=lambda call: get_callback_name_from_call(call) == CallbackData.QUIZZES_TOPIC)
+@bot.callback_route(CallbackData.QUIZZES_TOPIC)
 def handle_quizzes_topic(call: CallbackQuery):
     logger.info("Received QUIZZES_TOPIC callback: {}", call.data)
     user = get_user_from_call(call)
@@ -42,7 +43,7 @@ def handle_quizzes_topic(call: CallbackQuery):
         logger.error("Missing or invalid topic_id in params: {}", params)
         return
 
-    topic = QuizTopic.objects.filter(id=topic_id).first()
+    topic = catalog_store.get().topics.get(topic_id)
     if not topic:
         logger.error("QuizTopic not found: id={} for user {}", topic_id, user.id)
         return
@@ -50,7 +51,7 @@ def handle_quizzes_topic(call: CallbackQuery):
     logger.debug("Sending level choices for topic {} to user {}", topic.id, user.id)
     SendMessages.Quizzes.choose_level(user, topic)
 
-@bot.callback_query_handler(func=lambda call: get_callback_name_from_call(call) == CallbackData.QUIZZES_LEVEL)
+@bot.callback_route(CallbackData.QUIZZES_LEVEL)
 def handle_quizzes_level(call: CallbackQuery):
     logger.info("Received QUIZZES_LEVEL callback: {}", call.data)
     user = get_user_from_call(call)
@@ -78,8 +79,9 @@ def handle_quizzes_level(call: CallbackQuery):
             session_to_delete.delete()
             logger.info("Deleted session {}", session_to_delete_id)
 
-    level = QuizLevel.objects.filter(id=level_id).first()
-    topic = QuizTopic.objects.filter(id=topic_id).first()
+    catalog = catalog_store.get()
+    level = catalog.levels.get(level_id)
+    topic = catalog.topics.get(topic_id)
     if not level or not topic:
         logger.error("Level or topic not found: level_id={}, topic_id={}", level_id, topic_id)
         return
@@ -87,7 +89,7 @@ def handle_quizzes_level(call: CallbackQuery):
     logger.debug("Sending quiz choices for topic {} level {} to user {}", topic.id, level.id, user.id)
     SendMessages.Quizzes.choose_quiz(user, topic, level)
 
-@bot.callback_query_handler(func=lambda call: get_callback_name_from_call(call) == CallbackData.QUIZZES_QUIZ)
+@bot.callback_route(CallbackData.QUIZZES_QUIZ)
 def handle_quizzes_quiz(call: CallbackQuery):
     logger.info("Received QUIZZES_QUIZ callback: {}", call.data)
     user = get_user_from_call(call)
@@ -102,21 +104,21 @@ def handle_quizzes_quiz(call: CallbackQuery):
         logger.error("Missing or invalid quiz_id in params: {}", params)
         return
 
-    quiz = Quiz.objects.filter(id=quiz_id).first()
+    quiz = catalog_store.get().quizzes.get(quiz_id)
     if not quiz:
         logger.error("Quiz not found: id={}", quiz_id)
         return    
 
-    question = quiz.questions.order_by("order").first()
+    question = Question.objects.filter(quiz_id=quiz.id).order_by("order").first()
     if not question:
         logger.error("No questions found for quiz id={}", quiz_id)
         return
     
-    session = UserQuizSession.objects.create(user=user, quiz=quiz)
+    session = UserQuizSession.objects.create(user=user, quiz_id=quiz.id)
     logger.info("Created new session {} for user {} quiz {}", session.id, user.id, quiz.id)
     SendMessages.Quizzes.question(user, question, session)
 
-@bot.callback_query_handler(func=lambda call: get_callback_name_from_call(call) == CallbackData.QUIZZES_QUIZ_QUESTION_CHOISE)
+@bot.callback_route(CallbackData.QUIZZES_QUIZ_QUESTION_CHOISE)
 def handle_quizzes_question_choice(call: CallbackQuery):
     logger.info("Received QUIZZES_QUIZ_QUESTION_CHOISE callback: {}", call.data)
     user = get_user_from_call(call)
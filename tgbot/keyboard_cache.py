@@ -0,0 +1,49 @@
+import functools
+import threading
+
+from cachetools import LRUCache
+from django.db.models import Model
+from telebot.types import InlineKeyboardMarkup
+
+from tgbot import content_version
+from tgbot.logics.constants import Constants
+
+
+_lock = threading.Lock()
+# (kind, params, версия контента) -> JSON клавиатуры
+_cache: LRUCache = LRUCache(maxsize=Constants.KEYBOARD_CACHE_SIZE)
+
+
+def _param(value):
+    # модели и узлы каталога в ключе — по id: клавиатура зависит только от контента, а он версионирован
+    if isinstance(value, Model):
+        return value.pk
+    return getattr(value, "id", value)
+
+
+def cached_keyboard(kind: str):
+    """
+    Декоратор для клавиатур Keyboards, которые строятся только из контента
+    (разделы, статьи, квизы, глоссарий): готовая клавиатура хранится как JSON
+    по ключу (kind, параметры, версия контента) и собирается заново без
+    запросов в БД. Версию увеличивают signals при любом изменении контента,
+    поэтому правки из админки видны сразу. Если версия недоступна (нет Redis),
+    клавиатура строится как обычно.
+    """
+    def decorator(build):
+        @functools.wraps(build)
+        def wrapper(*args):
+            version = content_version.current()
+            if version is None:
+                return build(*args)
+            key = (kind, tuple(_param(arg) for arg in args), version)
+            with _lock:
+                raw = _cache.get(key)
+            if raw is None:
+                raw = build(*args).to_json()
+                with _lock:
+                    _cache[key] = raw
+            # каждый раз новый объект: вызывающий код может дописывать кнопки
+            return InlineKeyboardMarkup.de_json(raw)
+        return wrapper
+    return decorator
@@ -0,0 +1,155 @@
+from django_redis import get_redis_connection
+
+from tgbot.models import SentMessage, TelegramUser
+from tgbot.logics.constants import Constants
+from tgbot.write_behind import WriteBehindBuffer
+
+from pathlib import Path
+from loguru import logger
+
+Path("logs").mkdir(parents=True, exist_ok=True)
+
+log_filename = Path("logs") / f"{Path(__file__).stem}.log"
+logger.add(str(log_filename), rotation="10 MB", level="INFO")
+
+
+# значение указателя «сообщений нет» — чтобы не ходить в БД и за новыми пользователями
+_NONE = "0"
+
+
+class LastMessages:
+    """
+    Указатель chat_id -> message_id последнего сообщения бота для
+    SendMessages._update_or_replace_last.
+
+    Указатель живёт в Redis (LAST_MESSAGE_TTL), поэтому обычное нажатие
+    кнопки не трогает БД. SentMessage остаётся долговременной копией:
+    новые записи создаются отложенно пачкой (bulk_create), а из таблицы
+    указатель восстанавливается, если его нет в Redis.
+
+    Запись SentMessage может ждать в буфере другого воркера, поэтому
+    id сообщений чата дублируются в список Redis (ключ :ids), и forced_delete
+    берёт их оттуда вместе с таблицей. Наибольший удалённый id сохраняется
+    (ключ :floor), и запоздавшие записи с id не больше него не вставляются —
+    id сообщений в чате растут.
+    """
+
+    def __init__(self):
+        # (user_pk, chat_id, message_id) -> None; порядок вставки сохраняет порядок created_at
+        self._writes = WriteBehindBuffer(
+            "sent_messages", self._flush, Constants.SENT_MESSAGES_FLUSH_INTERVAL
+        )
+
+    @staticmethod
+    def _key(chat_id: int) -> str:
+        return f"{Constants.LAST_MESSAGE_PREFIX}:{chat_id}"
+
+    @staticmethod
+    def _ids_key(chat_id: int) -> str:
+        return f"{Constants.LAST_MESSAGE_PREFIX}:{chat_id}:ids"
+
+    @staticmethod
+    def _floor_key(chat_id: int) -> str:
+        return f"{Constants.LAST_MESSAGE_PREFIX}:{chat_id}:floor"
+
+    @staticmethod
+    def _store(chat_id: int, message_id: int | None):
+        try:
+            get_redis_connection("default").set(
+                LastMessages._key(chat_id), message_id or _NONE, ex=Constants.LAST_MESSAGE_TTL
+            )
+        except Exception as e:
+            logger.warning(f"LastMessages: не удалось записать указатель chat_id={chat_id}: {e}")
+
+    def _load(self, user: TelegramUser) -> int | None:
+        # в таблицу должны попасть ещё не записанные сообщения
+        self._writes.flush()
+        return (
+            SentMessage.objects.filter(telegram_user_id=user.pk)
+            .order_by("-created_at")
+            .values_list("message_id", flat=True)
+            .first()
+        )
+
+    def get(self, user: TelegramUser) -> int | None:
+        """message_id последнего сообщения бота в чате пользователя или None."""
+        try:
+            raw = get_redis_connection("default").get(self._key(user.chat_id))
+        except Exception as e:
+            logger.warning(f"LastMessages: Redis недоступен, читаем из БД: {e}")
+            return self._load(user)
+        if raw is not None:
+            return int(raw) or None
+
+        message_id = self._load(user)
+        self._store(user.chat_id, message_id)
+        return message_id
+
+    def record(self, user: TelegramUser, message_id: int):
+        """Новое сообщение стало последним; запись SentMessage создастся в фоне."""
+        chat_id = user.chat_id
+        try:
+            pipe = get_redis_connection("default").pipeline()
+            pipe.set(self._key(chat_id), message_id, ex=Constants.LAST_MESSAGE_TTL)
+            pipe.rpush(self._ids_key(chat_id), message_id)
+            pipe.ltrim(self._ids_key(chat_id), -Constants.LAST_MESSAGE_IDS_MAX, -1)
+            pipe.expire(self._ids_key(chat_id), Constants.LAST_MESSAGE_TTL)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"LastMessages: не удалось записать указатель chat_id={chat_id}: {e}")
+        self._writes.put((user.pk, chat_id, message_id), None)
+
+    def pop_all(self, user: TelegramUser) -> list[int]:
+        """
+        Все известные сообщения чата (для forced_delete): удаляет их записи
+        SentMessage и сбрасывает указатель.
+        """
+        chat_id = user.chat_id
+        self._writes.flush()
+        ids = set()
+        redis_conn = None
+        try:
+            redis_conn = get_redis_connection("default")
+            pipe = redis_conn.pipeline()
+            pipe.lrange(self._ids_key(chat_id), 0, -1)
+            pipe.delete(self._ids_key(chat_id))
+            pipe.set(self._key(chat_id), _NONE, ex=Constants.LAST_MESSAGE_TTL)
+            ids.update(int(raw) for raw in pipe.execute()[0])
+        except Exception as e:
+            logger.warning(f"LastMessages: Redis недоступен, сообщения chat_id={chat_id} берём только из БД: {e}")
+            redis_conn = None
+        qs = SentMessage.objects.filter(telegram_user_id=user.pk)
+        ids.update(qs.values_list("message_id", flat=True))
+        qs.delete()
+        if redis_conn is not None and ids:
+            try:
+                redis_conn.set(self._floor_key(chat_id), max(ids), ex=Constants.LAST_MESSAGE_TTL)
+            except Exception as e:
+                logger.warning(f"LastMessages: не удалось сохранить floor chat_id={chat_id}: {e}")
+        return sorted(ids)
+
+    def _floors(self, chat_ids) -> dict[int, int]:
+        chat_ids = list(chat_ids)
+        try:
+            raw = get_redis_connection("default").mget([self._floor_key(chat_id) for chat_id in chat_ids])
+        except Exception as e:
+            logger.warning(f"LastMessages: Redis недоступен, floor не проверяем: {e}")
+            return {}
+        return {chat_id: int(value) for chat_id, value in zip(chat_ids, raw) if value is not None}
+
+    def _flush(self, items: dict[tuple, None]):
+        # пользователь мог быть удалён, пока его сообщения ждали в буфере
+        existing = set(
+            TelegramUser.objects.filter(pk__in={pk for pk, _, _ in items}).values_list("pk", flat=True)
+        )
+        # сообщения, уже удалённые forced_delete в другом воркере
+        floors = self._floors({chat_id for _, chat_id, _ in items})
+        SentMessage.objects.bulk_create(
+            [SentMessage(telegram_user_id=pk, message_id=message_id)
+             for pk, chat_id, message_id in items
+             if pk in existing and message_id > floors.get(chat_id, 0)],
+            batch_size=500,
+        )
+
+
+last_messages = LastMessages()
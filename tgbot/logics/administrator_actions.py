@@ -1,6 +1,7 @@
 from tgbot.models import TelegramUser
 import telebot
 import time
+import uuid
 from tgbot.logics.constants import *
 from pathlib import Path
 from loguru import logger
@@ -11,25 +12,30 @@ log_filename = Path("logs") / f"{Path(__file__).stem}.log"
 logger.add(str(log_filename), rotation="10 MB", level="INFO")
 
 def mass_mailing(admin: TelegramUser, users:list[TelegramUser]=None, text = None, ):
-    from tgbot.dispatcher import get_main_bot
-    bot = get_main_bot()
+    """
+    Ставит рассылку в outbox (tgbot/outbox.py): сообщения отправляются
+    в фоне и будут досланы даже после перезапуска или перезагрузки ботов.
+    """
+    from tgbot.outbox import enqueue_many
+    from tgbot.user_cache import load_deferred
     msg = ""
     if text is not None and admin is not None:
+        # admin может быть собран из кэша (handlers): подпись догружаем одним запросом
+        load_deferred(admin)
         msg = f"{text}\n\n{admin.admin_signature or 'Администратор'}"
     else:
         return None
     
     if users is None:
         users = TelegramUser.objects.exclude(blocked=True)
-    total_users = len(users)
 
-    num = 0
-    for user in users:
-        try:
-            bot.send_message(user.chat_id, msg)
-            num += 1
-        except Exception as e:
-            logger.error(f"mass_mailing: Failed to send message to {user.chat_id}: {e}")
+    # у каждой рассылки свой идентификатор: внутри неё один пользователь получает сообщение один раз
+    mailing_id = uuid.uuid4().hex
+    total_users = enqueue_many(
+        ("send_message", f"mailing:{mailing_id}:{user.chat_id}", {"chat_id": user.chat_id, "text": msg})
+        for user in users
+    )
+    logger.info(f"mass_mailing: рассылка {mailing_id} поставлена в очередь для {total_users} пользователей")
 
-    final_text = f"Рассылка закончена\nКоличество обработанных пользователей:\n{total_users} из {total_users}\nУспешно отправлено: {num}\nОшибок отправки: {total_users - num}"
+    final_text = f"Рассылка поставлена в очередь\nКоличество пользователей: {total_users}\nИдентификатор рассылки: {mailing_id}"
     return final_text
\ No newline at end of file
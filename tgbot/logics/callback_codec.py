@@ -0,0 +1,149 @@
+import base64
+import urllib.parse
+from collections import namedtuple
+from functools import lru_cache
+from types import MappingProxyType
+
+from tgbot.logics.constants import CallbackData
+
+
+# name — имя callback (CallbackData.*), params — {ключ: значение} только для чтения
+# (разбор кэшируется и общий для всех потоков); целые значения уже int
+ParsedCallback = namedtuple("ParsedCallback", ("name", "params"))
+
+
+class CallbackCodec:
+    """
+    Компактный формат callback_data, версия 1:
+
+        "1" + опкод (один символ base64url) + base64url(varint-поля без паддинга)
+
+    Опкод — индекс действия в ACTIONS, поля — целые параметры действия в порядке,
+    заданном там же; каждое поле пишется как varint(value + 1), 0 — параметра нет,
+    хвостовые пустые поля не пишутся. Например, выбор ответа в квизе с двумя
+    ID занимает 6–10 байт вместо ~40 в URL-формате.
+
+    Старый формат "name?key=value&..." по-прежнему разбирается — кнопки,
+    уже отправленные в чаты, продолжают работать. Имена CallbackData не
+    начинаются с цифры, поэтому форматы не пересекаются.
+    """
+
+    VERSION = "1"
+    _ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+
+    # Только дописывать в конец: опкод — позиция в этом списке,
+    # а callback_data уже разосланных кнопок хранится в чатах.
+    ACTIONS = (
+        (CallbackData.MENU, (CallbackData.QUIZZES_QUIZ_SESSION_DELETE_ID,)),
+        (CallbackData.ARTICLES_SECTION, (CallbackData.ARTICLES_SECTION_ID,)),
+        (CallbackData.ARTICLES_SUBSECTION, (CallbackData.ARTICLES_SUBSECTION_ID,)),
+        (CallbackData.QUIZZES_TOPIC, (CallbackData.QUIZZES_TOPIC_ID,)),
+        (CallbackData.QUIZZES_LEVEL, (
+            CallbackData.QUIZZES_LEVEL_ID,
+            CallbackData.QUIZZES_TOPIC_ID,
+            CallbackData.QUIZZES_QUIZ_SESSION_DELETE_ID,
+        )),
+        (CallbackData.QUIZZES_QUIZ, (CallbackData.QUIZZES_QUIZ_ID,)),
+        (CallbackData.QUIZZES_QUIZ_QUESTION_CHOISE, (
+            CallbackData.QUIZZES_QUIZ_QUESTION_CHOISE_ID,
+            CallbackData.QUIZZES_QUIZ_SESSION_ID,
+        )),
+    )
+
+    _OPCODES = {name: (opcode, keys) for opcode, (name, keys) in zip(_ALPHABET, ACTIONS)}
+    _ACTIONS_BY_OPCODE = dict(zip(_ALPHABET, ACTIONS))
+
+    @staticmethod
+    def _write_varint(out: bytearray, value: int):
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+    @staticmethod
+    def _read_varints(raw: bytes) -> list[int]:
+        values, value, shift = [], 0, 0
+        for byte in raw:
+            value |= (byte & 0x7F) << shift
+            if byte & 0x80:
+                shift += 7
+            else:
+                values.append(value)
+                value, shift = 0, 0
+        if shift:
+            raise ValueError("обрезанный varint")
+        return values
+
+    @classmethod
+    def encode(cls, name: str, params: dict | None = None) -> str | None:
+        """
+        Компактная строка для действия, или None, если его параметры
+        не укладываются в формат (нет в ACTIONS, лишний ключ, не целое ≥ 0).
+        """
+        action = cls._OPCODES.get(name)
+        if action is None:
+            return None
+        opcode, keys = action
+        params = params or {}
+        if any(key not in keys for key in params):
+            return None
+
+        fields = []
+        for key in keys:
+            value = params.get(key)
+            if value is None:
+                fields.append(0)
+                continue
+            if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+                return None
+            fields.append(value + 1)
+        while fields and fields[-1] == 0:
+            fields.pop()
+
+        raw = bytearray()
+        for field in fields:
+            cls._write_varint(raw, field)
+        return cls.VERSION + opcode + base64.urlsafe_b64encode(bytes(raw)).decode().rstrip("=")
+
+    @classmethod
+    def _decode_compact(cls, data: str) -> ParsedCallback:
+        name, keys = cls._ACTIONS_BY_OPCODE[data[1]]
+        body = data[2:]
+        raw = base64.urlsafe_b64decode(body + "=" * (-len(body) % 4))
+        fields = cls._read_varints(raw)
+        if len(fields) > len(keys):
+            raise ValueError("лишние поля")
+        params = {key: field - 1 for key, field in zip(keys, fields) if field}
+        return ParsedCallback(name, MappingProxyType(params))
+
+    @staticmethod
+    def _decode_legacy(data: str) -> ParsedCallback:
+        name, _, query = data.partition("?")
+        params = {}
+        for key, values in urllib.parse.parse_qs(query).items():
+            value = values[0]
+            digits = value[1:] if value.startswith("-") else value
+            params[key] = int(value) if digits.isdigit() else value
+        return ParsedCallback(name, MappingProxyType(params))
+
+    @classmethod
+    def decode(cls, data: str) -> ParsedCallback:
+        """
+        Разбирает оба формата. Повреждённая компактная строка даёт
+        действие с пустым именем — такой callback не найдёт handler.
+        """
+        if data.startswith(cls.VERSION) and len(data) >= 2:
+            try:
+                return cls._decode_compact(data)
+            except (KeyError, ValueError):
+                return ParsedCallback("", MappingProxyType({}))
+        return cls._decode_legacy(data)
+
+
+@lru_cache(maxsize=4096)
+def parse_callback(data: str) -> ParsedCallback:
+    """
+    Общий кэш разбора callback_data: префильтр вебхука, маршрутизатор SyncBot
+    и handlers разбирают одну строку один раз. params — только для чтения.
+    """
+    return CallbackCodec.decode(data or "")
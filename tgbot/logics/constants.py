@@ -1,3 +1,5 @@
+import os
+
 class CallbackData:
     # Общий ключ для ID
     ID = "i"
@@ -57,6 +59,11 @@ class CallbackData:
 class Commands:
     START = "start"
 
+class Steps:
+    # шаги ввода текста (см. SyncBot.step_handler); хранятся в Redis, не переименовывать без нужды
+    MOON_CALC_DATE = "mc_date"
+    INT_FACTS_TIME = "if_time"
+
 class ButtonNames:
     BACK = "⬅️ Назад"
     MENU = "🏠 Меню"
@@ -103,6 +110,111 @@ class Constants:
 
     MAX_RETRIES_TO_SET_WEBHOOK = 5
 
+    # Лимиты исходящих вызовов Bot API (tgbot/rate_limiter.py)
+    RATE_LIMIT_GLOBAL_PER_SEC = 30
+    RATE_LIMIT_PRIVATE_CHAT_PER_SEC = 1
+    RATE_LIMIT_PRIVATE_CHAT_BURST = 3
+    RATE_LIMIT_GROUP_CHAT_PER_MIN = 20
+    RATE_LIMIT_EDIT_PER_SEC = 30
+    RATE_LIMIT_EDIT_CHAT_PER_SEC = 1
+    RATE_LIMIT_EDIT_CHAT_BURST = 5
+    RATE_LIMIT_BULK_PER_SEC = 25
+    # 429 по стольким разным чатам за окно (сек) — пауза для всех вызовов
+    RATE_LIMIT_GLOBAL_429_CHATS = 3
+    RATE_LIMIT_GLOBAL_429_WINDOW = 1
+
+    # Повторы исходящих вызовов при 429, 5xx и сетевых ошибках
+    OUTBOUND_MAX_RETRIES = 5
+    OUTBOUND_BACKOFF_BASE = 0.5
+    OUTBOUND_BACKOFF_MAX = 30
+    OUTBOUND_DEAD_LETTERS_MAX = 1000
+
+    # HTTP-транспорт Bot API (tgbot/transport.py): "requests" или "http2" (нужен httpx[http2])
+    TG_HTTP_BACKEND = os.getenv("TG_HTTP_BACKEND", "requests")
+    TG_CONNECT_TIMEOUT = 3.05
+    TG_READ_TIMEOUT = 15
+    TG_MEDIA_CONNECT_TIMEOUT = 5
+    TG_MEDIA_READ_TIMEOUT = 120
+
+    # Кэш заблокировавших бота чатов (tgbot/blocked_chats.py)
+    BLOCKED_CHATS_FLUSH_INTERVAL = 5
+    BLOCKED_CHATS_REDIS = os.getenv("BLOCKED_CHATS_REDIS", "0") == "1"
+    BLOCKED_CHATS_KEY = "tgbot_blocked_chats"
+
+    # Распределённая очередь исходящих вызовов через Redis stream (tgbot/outbound_redis.py)
+    OUTBOUND_DISTRIBUTED = os.getenv("OUTBOUND_DISTRIBUTED", "0") == "1"
+    OUTBOUND_REDIS_PREFIX = "tgbot_outbound"
+    OUTBOUND_STREAM_MAXLEN = 100000
+    OUTBOUND_STREAM_BATCH = 100
+    OUTBOUND_STREAM_MAX_IN_FLIGHT = 500
+    # stream делится на партиции по chat_id; каждую читает один воркер —
+    # владелец аренды, которая живёт OUTBOUND_PARTITION_LEASE секунд без продления
+    OUTBOUND_STREAM_PARTITIONS = 32
+    OUTBOUND_PARTITION_LEASE = 30
+    OUTBOUND_REPLY_TTL = 300
+    # сколько отправитель ждёт ответа исполнителя, прежде чем завершить Future ошибкой
+    OUTBOUND_REPLY_TIMEOUT = 180
+
+    # Outbox массовых и плановых рассылок (tgbot/outbox.py)
+    OUTBOX_BATCH = 200
+    OUTBOX_CONCURRENCY = 16
+    OUTBOX_POLL_INTERVAL = 2
+    # на сколько секунд запись закрепляется за воркером, взявшим её в работу
+    OUTBOX_LEASE = 300
+    OUTBOX_MAX_ATTEMPTS = 5
+    OUTBOX_RETRY_DELAY = 30
+
+    # Обработка входящих апдейтов вебхука в фоне (tgbot/update_workers.py):
+    # число потоков — сколько чатов обрабатывается параллельно
+    UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", 8))
+    UPDATE_QUEUE_SIZE = 1000
+    # по скольким последним чатам хранить статистику ожидания
+    UPDATE_STATS_CHATS = 1000
+
+    # Отсев повторных доставок апдейтов по update_id (tgbot/update_dedup.py)
+    UPDATE_DEDUP_PREFIX = "tgbot_update"
+    UPDATE_DEDUP_TTL = 600
+    UPDATE_DEDUP_LOCAL_SIZE = 10000
+
+    # Кэш пользователей для sync_user_data (tgbot/user_cache.py)
+    USER_CACHE_PREFIX = "tgbot_user"
+    USER_CACHE_TTL = 24 * 60 * 60
+    USER_CACHE_LOCAL_SIZE = 10000
+    USER_CACHE_LOCAL_TTL = 60
+    USER_PROFILE_FLUSH_INTERVAL = 5
+
+    # Состояние диалогов — ожидаемый шаг ввода (tgbot/conversation.py);
+    # пользователь, не ответивший за CONVERSATION_TTL секунд, выходит из шага
+    CONVERSATION_PREFIX = "tgbot_step"
+    CONVERSATION_TTL = 60 * 60
+
+    # Отложенная запись в БД (tgbot/write_behind.py): ключ, не записанный
+    # столько раз подряд, уходит в dead_letters буфера
+    WRITE_BEHIND_MAX_ATTEMPTS = 5
+    WRITE_BEHIND_DEAD_LETTERS_MAX = 1000
+
+    # Указатель на последнее сообщение бота в чате (tgbot/last_message.py)
+    LAST_MESSAGE_PREFIX = "tgbot_last_message"
+    LAST_MESSAGE_TTL = 7 * 24 * 60 * 60
+    # сколько последних id сообщений чата держать в Redis для forced_delete
+    LAST_MESSAGE_IDS_MAX = 1000
+    SENT_MESSAGES_FLUSH_INTERVAL = 5
+
+    # Заголовки статей и фактов из telegraph (tgbot/telegraph_titles.py)
+    TELEGRAPH_TITLE_REFRESH_INTERVAL = 24 * 60 * 60
+    TELEGRAPH_TITLE_REFRESH_FLAG = "tgbot_telegraph_titles_refresh"
+    TELEGRAPH_API_URL = "https://api.telegra.ph/getPage/{path}"
+    TELEGRAPH_FETCH_CONCURRENCY = 16
+    TELEGRAPH_FETCH_BATCH = 200
+    TELEGRAPH_FETCH_TIMEOUT = 10
+
+    # Версия контента для кэшей клавиатур и каталога (tgbot/content_version.py)
+    CONTENT_VERSION_KEY = "tgbot_content_version"
+    KEYBOARD_CACHE_SIZE = 2000
+
+    # Количество потоков-отправителей в SyncBot (переопределяется через OUTBOUND_WORKERS)
+    OUTBOUND_WORKERS = int(os.getenv("OUTBOUND_WORKERS", 4))
+
 class Messages:
     MENU_MESSAGE = "🏠 Главное меню"
 
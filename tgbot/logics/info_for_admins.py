@@ -15,7 +15,12 @@ logger.add(str(log_filename), rotation="10 MB", level="INFO")
 def send_messege_to_admins(msg, markup=None, admins=None):
     admins = admins if admins is not None else TelegramUser.objects.filter(send_admin_notifications=True)
     for admin in admins:
-        try:
-            bot.send_message(admin.chat_id, msg, reply_markup=markup)
-        except Exception as e:
-            logger.error(f"Не удалось отправить уведомление администратору {admin.chat_id}. Ошибка: {e}")
\ No newline at end of file
+        bot.send_message_async(
+            admin.chat_id, msg, reply_markup=markup,
+            on_done=lambda future, chat_id=admin.chat_id: _log_admin_failure(future, chat_id)
+        )
+
+def _log_admin_failure(future, chat_id):
+    exc = future.exception()
+    if exc is not None:
+        logger.error(f"Не удалось отправить уведомление администратору {chat_id}. Ошибка: {exc}")
\ No newline at end of file
@@ -1,7 +1,9 @@
-from tgbot.logics.telegraph_helper import parse_telegraph_title
 from tgbot.models import ArticlesSection, ArticlesSubsection, Choice, Glossary, InterestingFact, Question, QuizTopic, QuizLevel, Quiz, UserQuizSession
 from telebot.types import Message, InlineKeyboardButton, InlineKeyboardMarkup
 from tgbot.logics.constants import *
+from tgbot.logics.callback_codec import CallbackCodec
+from tgbot.keyboard_cache import cached_keyboard
+from tgbot.catalog import catalog_store, LevelNode, SectionNode, SubsectionNode, TopicNode
 from urllib.parse import urlencode
 from pathlib import Path
 from loguru import logger
@@ -17,7 +19,7 @@ class Keyboards:
     @staticmethod
     def build_callback_data(base: str, params: dict[str, str] = None) -> str:
         """
-        Формирует callback_data в формате URL-подобной строки.
+        Формирует callback_data.
 
         Аргументы:
             base: базовая строка callback_data (без “?” и параметров)
@@ -25,11 +27,16 @@ class Keyboards:
 
         Возвращает:
             Если params пуст или None, возвращает просто base.
+            Если действие и его целые параметры описаны в CallbackCodec — компактную строку.
             Иначе – строку "base?ключ1=знач1&ключ2=знач2&…", где ключи и значения URL-кодируются.
         """
         if not params:
             return base
 
+        compact = CallbackCodec.encode(base, params)
+        if compact is not None:
+            return compact
+
         # urlencode автоматически экранирует пробелы, кириллицу и спецсимволы
         query = urlencode(params, doseq=True)
         return f"{base}?{query}"
@@ -54,6 +61,7 @@ class Keyboards:
 
     class MainMenu:
         @staticmethod
+        @cached_keyboard("main_menu")
         def menu():
             markup = InlineKeyboardMarkup()
 
@@ -145,7 +153,7 @@ class Keyboards:
             
             if int_fact is not None:
                 link = InlineKeyboardButton(
-                    text=parse_telegraph_title(int_fact.link),
+                    text=int_fact.title or int_fact.link,
                     callback_data=CallbackData.INT_FACTS_TODAY,
                     url=int_fact.link
                 )
@@ -192,11 +200,13 @@ class Keyboards:
         
     class Articles:
         @staticmethod
+        @cached_keyboard("articles_sections")
         def choose_section():
-            sections = ArticlesSection.objects.all()
+            catalog = catalog_store.get()
             markup = InlineKeyboardMarkup()
 
-            for section in sections:
+            for section_id in catalog.section_ids:
+                section = catalog.sections[section_id]
                 callback = Keyboards.build_callback_data(CallbackData.ARTICLES_SECTION, {CallbackData.ARTICLES_SECTION_ID: section.id})
                 btn = InlineKeyboardButton(text=section.title, callback_data=callback)
                 markup.add(btn)
@@ -204,11 +214,13 @@ class Keyboards:
             return Keyboards._add_menu(markup)
         
         @staticmethod
-        def choose_subsection(article_section: ArticlesSection):
-            subsections = article_section.subsections.all()
+        @cached_keyboard("articles_subsections")
+        def choose_subsection(article_section: SectionNode):
+            catalog = catalog_store.get()
             markup = InlineKeyboardMarkup()
 
-            for subsection in subsections:
+            for subsection_id in article_section.subsection_ids:
+                subsection = catalog.subsections[subsection_id]
                 callback = Keyboards.build_callback_data(CallbackData.ARTICLES_SUBSECTION, {CallbackData.ARTICLES_SUBSECTION_ID: subsection.id})
                 btn = InlineKeyboardButton(text=subsection.title, callback_data=callback)
                 markup.add(btn)
@@ -216,24 +228,25 @@ class Keyboards:
             return Keyboards._add_menu(Keyboards._add_back(markup, CallbackData.ARTICLES))
         
         @staticmethod
-        def choose_article(article_subsection: ArticlesSubsection):
-            articles = article_subsection.articles.all()
+        @cached_keyboard("articles")
+        def choose_article(article_subsection: SubsectionNode):
             markup = InlineKeyboardMarkup()
 
-            for article in articles:
-                title = parse_telegraph_title(article.link)
-                btn = InlineKeyboardButton(text=title, url=article.link)
+            for article in article_subsection.articles:
+                btn = InlineKeyboardButton(text=article.title or article.link, url=article.link)
                 markup.add(btn)
 
-            return Keyboards._add_menu(Keyboards._add_back(markup, Keyboards.build_callback_data(CallbackData.ARTICLES_SECTION, {CallbackData.ARTICLES_SECTION_ID: article_subsection.section.id})))
+            return Keyboards._add_menu(Keyboards._add_back(markup, Keyboards.build_callback_data(CallbackData.ARTICLES_SECTION, {CallbackData.ARTICLES_SECTION_ID: article_subsection.section_id})))
         
     class Quizzes:
         @staticmethod
+        @cached_keyboard("quiz_topics")
         def choose_topic():
-            topics = QuizTopic.objects.all()
+            catalog = catalog_store.get()
             markup = InlineKeyboardMarkup()
 
-            for topic in topics:
+            for topic_id in catalog.topic_ids:
+                topic = catalog.topics[topic_id]
                 callback = Keyboards.build_callback_data(CallbackData.QUIZZES_TOPIC, {CallbackData.QUIZZES_TOPIC_ID: topic.id})
                 btn = InlineKeyboardButton(text=topic.title, callback_data=callback)
                 markup.add(btn)
@@ -241,11 +254,13 @@ class Keyboards:
             return Keyboards._add_menu(markup)
 
         @staticmethod
-        def choose_level(quiz_topic: QuizTopic) -> InlineKeyboardMarkup:
-            levels = QuizLevel.objects.filter(quizzes_by_level__topic=quiz_topic).distinct()
+        @cached_keyboard("quiz_levels")
+        def choose_level(quiz_topic: TopicNode) -> InlineKeyboardMarkup:
+            catalog = catalog_store.get()
             markup = InlineKeyboardMarkup()
 
-            for level in levels:
+            for level_id in quiz_topic.level_ids:
+                level = catalog.levels[level_id]
                 callback = Keyboards.build_callback_data(
                     CallbackData.QUIZZES_LEVEL,
                     {
@@ -259,11 +274,13 @@ class Keyboards:
             return Keyboards._add_menu(Keyboards._add_back(markup, CallbackData.QUIZZES))
 
         @staticmethod
-        def choose_quiz(quiz_topic: QuizTopic, quiz_level: QuizLevel) -> InlineKeyboardMarkup:
-            quizzes = Quiz.objects.filter(topic=quiz_topic, level=quiz_level)
+        @cached_keyboard("quizzes")
+        def choose_quiz(quiz_topic: TopicNode, quiz_level: LevelNode) -> InlineKeyboardMarkup:
+            catalog = catalog_store.get()
             markup = InlineKeyboardMarkup()
 
-            for quiz in quizzes:
+            for quiz_id in catalog.quiz_ids(quiz_topic.id, quiz_level.id):
+                quiz = catalog.quizzes[quiz_id]
                 callback = Keyboards.build_callback_data(
                     CallbackData.QUIZZES_QUIZ,
                     { CallbackData.QUIZZES_QUIZ_ID: quiz.id }
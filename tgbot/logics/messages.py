@@ -31,6 +31,8 @@ logger.add(str(log_filename), rotation="10 MB", level="DEBUG")
 
 from telebot.apihelper import ApiException
 from tgbot.models import SentMessage, TelegramUser
+from tgbot.last_message import last_messages
+from tgbot.catalog import LevelNode, SectionNode, SubsectionNode, TopicNode
 
 
 class SendMessages:
@@ -54,37 +56,32 @@ class SendMessages:
         if forced_delete:
             logger.info(f"_update_or_replace_last: forced_delete=True, удаляем все старые сообщения для user={user}.")
             try:
-                qs = SentMessage.objects.filter(telegram_user=user)
-                ids = list(qs.values_list("message_id", flat=True))
+                ids = last_messages.pop_all(user)
                 if ids:
                     logger.debug(f"_update_or_replace_last: пытаемся bot.delete_messages ids={ids}")
                     bot.delete_messages(chat_id, ids)
-                qs.delete()
                 logger.info(f"_update_or_replace_last: удалены все записи SentMessage для user={user}.")
             except Exception as e:
                 logger.error(f"_update_or_replace_last: ошибка при forced_delete: {e}")
-                SentMessage.objects.filter(telegram_user=user).delete()
 
-        # 2) Последнее отправленное сообщение
-        last = SentMessage.objects.filter(telegram_user=user).order_by("-created_at").first()
-        if last:
-            logger.debug(f"_update_or_replace_last: найдено последнее сообщение message_id={last.message_id} для user={user}.")
+        # 2) Последнее отправленное сообщение (указатель в Redis, без запроса в БД)
+        msg_id = last_messages.get(user)
+        if msg_id:
+            logger.debug(f"_update_or_replace_last: найдено последнее сообщение message_id={msg_id} для user={user}.")
         else:
             logger.debug(f"_update_or_replace_last: нет предыдущих сообщений для user={user}.")
 
         # 3) Если нет — просто отправляем новое и сохраняем
-        if not last:
+        if not msg_id:
             try:
                 new_msg = send_func()
-                SentMessage.objects.create(telegram_user=user, message_id=new_msg.message_id)
+                last_messages.record(user, new_msg.message_id)
                 logger.info(f"_update_or_replace_last: отправлено новое сообщение message_id={new_msg.message_id} для user={user}.")
                 return new_msg
             except Exception as e:
                 logger.error(f"_update_or_replace_last: ошибка при send_func: {e}")
                 raise
 
-        msg_id = last.message_id
-
         # 4) Пытаемся отредактировать
         try:
             logger.debug(f"_update_or_replace_last: пробуем редактировать message_id={msg_id} для user={user}.")
@@ -103,7 +100,7 @@ class SendMessages:
 
             try:
                 new_msg = send_func()
-                SentMessage.objects.create(telegram_user=user, message_id=new_msg.message_id)
+                last_messages.record(user, new_msg.message_id)
                 logger.info(f"_update_or_replace_last: отправлено новое сообщение message_id={new_msg.message_id} для user={user}.")
                 return new_msg
             except Exception as ex2:
@@ -485,7 +482,7 @@ class SendMessages:
             )
         
         @staticmethod
-        def choose_subsection(user: TelegramUser, article_section: ArticlesSection):
+        def choose_subsection(user: TelegramUser, article_section: SectionNode):
             logger.debug(f"Articles.choose_section: user={user}")
             SendMessages.update_or_replace_last_message(
                 user,
@@ -496,7 +493,7 @@ class SendMessages:
             )
 
         @staticmethod
-        def choose_article(user: TelegramUser, article_subsection: ArticlesSubsection):
+        def choose_article(user: TelegramUser, article_subsection: SubsectionNode):
             logger.debug(f"Articles.choose_article: user={user}")
             SendMessages.update_or_replace_last_message(
                 user,
@@ -519,7 +516,7 @@ class SendMessages:
             )
         
         @staticmethod
-        def choose_level(user: TelegramUser, quiz_topic: QuizTopic):
+        def choose_level(user: TelegramUser, quiz_topic: TopicNode):
             logger.debug(f"Quizzes.choose_level: user={user}")
             SendMessages.update_or_replace_last_message(
                 user,
@@ -530,7 +527,7 @@ class SendMessages:
             )
 
         @staticmethod
-        def choose_quiz(user: TelegramUser, quiz_topic: QuizTopic, quiz_level: QuizLevel):
+        def choose_quiz(user: TelegramUser, quiz_topic: TopicNode, quiz_level: LevelNode):
             logger.debug(f"Quizzes.choose_quiz: user={user}")
             SendMessages.update_or_replace_last_message(
                 user,
@@ -1,26 +1,112 @@
-import re
+import concurrent.futures
+import hashlib
+import json
+import urllib.parse
+from collections import namedtuple
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from tgbot.logics.constants import Constants
+
+from pathlib import Path
+from loguru import logger
+
+Path("logs").mkdir(parents=True, exist_ok=True)
+
+log_filename = Path("logs") / f"{Path(__file__).stem}.log"
+logger.add(str(log_filename), rotation="10 MB", level="INFO")
+
 
-def parse_telegraph_title(url: str) -> str | None:
+# Метаданные страницы из getPage. not_modified=True — сервер ответил 304,
+# остальные поля (кроме path) тогда пустые: страница не менялась.
+PageMeta = namedtuple(
+    "PageMeta",
+    ("path", "title", "author_name", "views", "content_hash", "etag", "last_modified", "not_modified"),
+)
+
+
+def telegraph_path(url: str) -> str | None:
     """
-    Запрашивает страницу telegra.ph и извлекает текст внутри тега <title>.
-    Убирает суффиксы « | Telegra.ph », « – Telegra.ph » или « - Telegraph » и всё, что после.
-    Возвращает None, если что-то пошло не так.
+    Путь страницы telegra.ph ("Title-01-31") из ссылки; None, если ссылка не на telegra.ph.
     """
-    try:
-        resp = requests.get(url, timeout=5)
-        resp.raise_for_status()
-        html = resp.text
-        match = re.search(r"<title>(.*?)</title>", html, re.IGNORECASE | re.DOTALL)
-        if not match:
-            return None
-        raw_title = match.group(1).strip()
-        # Убираем суффиксы «| Telegra.ph», «– Telegra.ph» или «- Telegraph»
-        cleaned = re.sub(
-            r"\s*[|–-]\s*(?:Telegra\.ph|Telegraph).*?$",
-            "",
-            raw_title
-        ).strip()
-        return cleaned or None
-    except Exception:
+    parsed = urllib.parse.urlparse(url.strip())
+    if parsed.netloc.lower() not in ("telegra.ph", "www.telegra.ph"):
         return None
+    return parsed.path.strip("/") or None
+
+
+def _content_hash(content) -> str:
+    raw = json.dumps(content, ensure_ascii=False, sort_keys=True).encode()
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+class TelegraphClient:
+    """
+    Пакетное чтение метаданных страниц через JSON API Telegraph (getPage).
+
+    Страницы запрашиваются параллельно, не более concurrency одновременно,
+    через одну сессию с пулом keep-alive соединений. Если известны ETag или
+    Last-Modified прошлого ответа, запрос условный: неизменившаяся
+    страница приходит как 304 без тела.
+    """
+
+    def __init__(self, concurrency: int = Constants.TELEGRAPH_FETCH_CONCURRENCY):
+        self._concurrency = max(1, concurrency)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._concurrency, max_retries=1)
+        self._session.mount("https://", adapter)
+
+    def fetch(self, path: str, etag: str | None = None, last_modified: str | None = None) -> PageMeta | None:
+        """Метаданные одной страницы; None — ошибка (записывается в лог)."""
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        try:
+            resp = self._session.get(
+                Constants.TELEGRAPH_API_URL.format(path=urllib.parse.quote(path)),
+                params={"return_content": "true"},
+                headers=headers,
+                timeout=Constants.TELEGRAPH_FETCH_TIMEOUT,
+            )
+            if resp.status_code == 304:
+                return PageMeta(path, None, None, None, None, etag, last_modified, True)
+            resp.raise_for_status()
+            data = resp.json()
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"TelegraphClient: getPage {path} не удался: {e}")
+            return None
+        if not data.get("ok"):
+            logger.warning(f"TelegraphClient: getPage {path} вернул ошибку: {data.get('error')}")
+            return None
+
+        page = data["result"]
+        return PageMeta(
+            path,
+            (page.get("title") or "").strip() or None,
+            page.get("author_name") or None,
+            page.get("views") or 0,
+            _content_hash(page.get("content")),
+            resp.headers.get("ETag"),
+            resp.headers.get("Last-Modified"),
+            False,
+        )
+
+    def fetch_many(self, pages) -> dict[str, PageMeta]:
+        """
+        pages — итерируемое из (path, etag, last_modified).
+        Возвращает {path: PageMeta} для страниц, которые удалось получить.
+        """
+        result = {}
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self._concurrency, thread_name_prefix="TelegraphFetch"
+        ) as executor:
+            futures = [executor.submit(self.fetch, *page) for page in pages]
+            for future in concurrent.futures.as_completed(futures):
+                meta = future.result()
+                if meta is not None:
+                    result[meta.path] = meta
+        return result
+
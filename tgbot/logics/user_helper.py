@@ -1,5 +1,4 @@
 import re
-import urllib.parse
 from telebot.types import CallbackQuery, MessageEntity
 
 from tgbot.dispatcher import get_main_bot
@@ -7,10 +6,10 @@ from tgbot.models import *
 from tgbot.logics.constants import *
 from tgbot.logics.messages import *
 from tgbot.logics.keyboards import *
+from tgbot.logics.callback_codec import parse_callback
 
 from pathlib import Path
 from loguru import logger
-from cachetools import TTLCache, cached
 
 # Убедимся, что папка logs существует
 Path("logs").mkdir(parents=True, exist_ok=True)
@@ -20,44 +19,51 @@ log_filename = Path("logs") / f"{Path(__file__).stem}.log"
 logger.add(str(log_filename), rotation="10 MB", level="INFO")
 
 def get_user_from_call(call: CallbackQuery) -> TelegramUser | None:
-    """Извлекает пользователя по chat_id из сообщения callback."""
-    
+    """
+    Пользователь callback: тот, что SyncBot.process_new_updates уже положил
+    в call.astro_user, иначе — поиск по chat_id в БД.
+    """
+    user = getattr(call, "astro_user", None)
+    if user is not None:
+        return user
     try:
         return TelegramUser.get_user_by_chat_id(chat_id=call.from_user.id)
     except TelegramUser.DoesNotExist:
         bot = get_main_bot()
         logger.error(f"Пользователь {call.from_user.id} не найден")
-        bot.answer_callback_query(call.id, Messages.USER_NOT_FOUND_ERROR)
+        bot.answer_callback_query_async(call.id, Messages.USER_NOT_FOUND_ERROR)
         return None
 
 def extract_query_params(call: CallbackQuery, show_warning: bool=True) -> dict:
-    """Извлекает параметры из callback data."""
-    try:
-        query_string = call.data.split("?", 1)[1]
-        return urllib.parse.parse_qs(query_string)
-    except IndexError:
-        if show_warning:
-            bot = get_main_bot()
-            bot.answer_callback_query(call.id, Messages.MISSING_PARAMETERS_ERROR)
-        return {}
+    """
+    Извлекает параметры из callback data (компактный или URL-формат, см. CallbackCodec).
+    Целые значения уже приведены к int. Возвращает копию: разбор callback
+    кэшируется, и его params общий для всех вызовов.
+    """
+    params = dict(parse_callback(call.data).params)
+    if not params and show_warning:
+        bot = get_main_bot()
+        bot.answer_callback_query_async(call.id, Messages.MISSING_PARAMETERS_ERROR)
+    return params
 
 def extract_int_param(call: CallbackQuery, params: dict, key: str, error_message: str | None=None) -> int | None:
     """Извлекает целочисленный параметр по ключу из словаря параметров."""
-    param_list = params.get(key)
-    if not param_list:
+    value = params.get(key)
+    if value is None:
         if error_message:
             bot = get_main_bot()
-            bot.answer_callback_query(call.id, error_message)
+            bot.answer_callback_query_async(call.id, error_message)
         return None
-    try:
-        return int(param_list[0])
-    except ValueError:
+    if not isinstance(value, int):
         if error_message:
             bot = get_main_bot()
-            bot.answer_callback_query(call.id, Messages.INCORRECT_VALUE_ERROR.format(key=key))
+            bot.answer_callback_query_async(call.id, Messages.INCORRECT_VALUE_ERROR.format(key=key))
         return None
+    return value
 
-get_callback_name_from_call_cache = TTLCache(maxsize=100, ttl=3)
-@cached(get_callback_name_from_call_cache)
 def get_callback_name_from_call(call: CallbackQuery):
-    return call.data.split("?", 1)[0]
\ No newline at end of file
+    """Имя callback: уже разобранное маршрутизатором SyncBot или из call.data."""
+    name = getattr(call, "callback_name", None)
+    if name is None:
+        name = parse_callback(call.data).name
+    return name
\ No newline at end of file
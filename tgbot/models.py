@@ -163,6 +163,78 @@ class SentMessage(models.Model):
     class Meta:
         verbose_name = 'Отправленное сообщение'
         verbose_name_plural = 'Отправленные сообщения'
+        indexes = [
+            models.Index(fields=['telegram_user', 'created_at'], name='sentmsg_user_created_idx'),
+        ]
+
+
+class OutboxMessage(models.Model):
+    """
+    Запись исходящей очереди (outbox) для массовых и плановых рассылок.
+    Хранится в БД, поэтому переживает перезапуск процесса и reload_bots();
+    отправляет записи tgbot.outbox.OutboxRelay.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Ожидает отправки'),
+        (STATUS_SENT, 'Отправлено'),
+        (STATUS_FAILED, 'Ошибка'),
+    )
+
+    idempotency_key = models.CharField(max_length=255, unique=True, verbose_name='Ключ идемпотентности')
+    action = models.CharField(max_length=64, verbose_name='Действие')
+    payload = models.JSONField(default=dict, blank=True, verbose_name='Параметры')
+    status = models.CharField(
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Попыток')
+    last_error = models.TextField(blank=True, default='', verbose_name='Последняя ошибка')
+    available_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Доступно с',
+        help_text='Раньше этого времени запись не берётся в работу (повтор или аренда другим воркером)'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    sent_at = models.DateTimeField(blank=True, null=True, verbose_name='Дата отправки')
+
+    def __str__(self):
+        return f"{self.action} [{self.idempotency_key}] — {self.status}"
+
+    class Meta:
+        verbose_name = 'Исходящее сообщение (outbox)'
+        verbose_name_plural = 'Исходящие сообщения (outbox)'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='outbox_status_available_idx'),
+        ]
+
+
+class TelegraphPage(models.Model):
+    """
+    Метаданные страницы telegra.ph из getPage: заголовок для Article
+    и InterestingFact, а также ETag/Last-Modified для условных запросов.
+    Заполняет tgbot.telegraph_titles.TelegraphTitles.
+    """
+    path = models.CharField(max_length=256, unique=True, verbose_name='Путь страницы')
+    title = models.CharField(max_length=256, blank=True, null=True, verbose_name='Заголовок')
+    author_name = models.CharField(max_length=128, blank=True, null=True, verbose_name='Автор')
+    views = models.PositiveIntegerField(default=0, verbose_name='Просмотры')
+    content_hash = models.CharField(max_length=32, blank=True, null=True, verbose_name='Хэш содержимого')
+    etag = models.CharField(max_length=256, blank=True, null=True, verbose_name='ETag')
+    last_modified = models.CharField(max_length=64, blank=True, null=True, verbose_name='Last-Modified')
+    fetched_at = models.DateTimeField(blank=True, null=True, verbose_name='Проверена')
+
+    def __str__(self):
+        return self.title or self.path
+
+    class Meta:
+        verbose_name = 'Страница telegraph'
+        verbose_name_plural = 'Страницы telegraph'
 
 
 class InterestingFact(models.Model):
@@ -176,6 +248,14 @@ class InterestingFact(models.Model):
         verbose_name='Дата для рассылки этого факта',
         help_text='Дата и время, когда факт будет отправлен подписчикам'
     )
+    title = models.CharField(
+        max_length=256,
+        blank=True,
+        null=True,
+        db_index=True,
+        verbose_name='Заголовок',
+        help_text='Заполняется автоматически из telegraph после сохранения ссылки'
+    )
 
 
     class Meta:
@@ -183,8 +263,8 @@ class InterestingFact(models.Model):
         verbose_name_plural = 'Интересные факты'
 
     def __str__(self):
-        from tgbot.logics.telegraph_helper import parse_telegraph_title
-        return parse_telegraph_title(self.link) or "Без названия"
+        # заголовок заполняется в фоне (tgbot/telegraph_titles.py), без запроса к telegra.ph
+        return self.title or self.link or "Без названия"
     
 class DailySubscription(models.Model):
     """
@@ -261,9 +341,17 @@ class Article(models.Model):
         blank=True,
         verbose_name='Подраздел статьи'
     )
+    title = models.CharField(
+        max_length=256,
+        blank=True,
+        null=True,
+        db_index=True,
+        verbose_name='Заголовок',
+        help_text='Заполняется автоматически из telegraph после сохранения ссылки'
+    )
 
     def __str__(self):
-        return self.link or "Статья без названия"
+        return self.title or self.link or "Статья без названия"
 
     class Meta:
         verbose_name = 'Статья'
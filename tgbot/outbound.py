@@ -0,0 +1,433 @@
+import concurrent.futures
+import datetime
+import heapq
+import itertools
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from loguru import logger
+from telebot.apihelper import ApiHTTPException, ApiTelegramException
+
+from tgbot.logics.constants import Constants
+from tgbot.rate_limiter import RateLimiter
+
+
+class Lane:
+    """
+    Классы приоритета исходящих вызовов.
+    Выбираются взвешенным round-robin, так что массовые рассылки
+    не могут надолго задержать ответы пользователю.
+    """
+    CALLBACK = 0      # answerCallbackQuery
+    INTERACTIVE = 1   # отправка/правка сообщений в ответ пользователю
+    BULK = 2          # рассылки и планировщик
+
+    ALL = (CALLBACK, INTERACTIVE, BULK)
+    NAMES = {CALLBACK: "callback", INTERACTIVE: "interactive", BULK: "bulk"}
+    WEIGHTS = {CALLBACK: 8, INTERACTIVE: 4, BULK: 1}
+
+
+class LaneStats:
+    """
+    Время ожидания вызовов в очереди по каждому классу приоритета
+    и число правок, схлопнутых более новыми (coalesced).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._count = {lane: 0 for lane in Lane.ALL}
+        self._total = {lane: 0.0 for lane in Lane.ALL}
+        self._max = {lane: 0.0 for lane in Lane.ALL}
+        self._coalesced = {lane: 0 for lane in Lane.ALL}
+
+    def record(self, lane: int, wait: float):
+        with self._lock:
+            self._count[lane] += 1
+            self._total[lane] += wait
+            if wait > self._max[lane]:
+                self._max[lane] = wait
+
+    def record_coalesced(self, lane: int):
+        with self._lock:
+            self._coalesced[lane] += 1
+
+    def snapshot(self) -> dict:
+        """
+        {"callback": {"count": ..., "avg_wait": ..., "max_wait": ..., "coalesced": ...}, ...}
+        """
+        with self._lock:
+            return {
+                Lane.NAMES[lane]: {
+                    "count": self._count[lane],
+                    "avg_wait": self._total[lane] / self._count[lane] if self._count[lane] else 0.0,
+                    "max_wait": self._max[lane],
+                    "coalesced": self._coalesced[lane],
+                }
+                for lane in Lane.ALL
+            }
+
+
+class DeadLetters:
+    """
+    Вызовы, исчерпавшие все повторы. Хранятся последние OUTBOUND_DEAD_LETTERS_MAX
+    записей, чтобы их можно было посмотреть (и при желании повторить вручную).
+    """
+
+    def __init__(self, maxlen: int = Constants.OUTBOUND_DEAD_LETTERS_MAX):
+        self._lock = threading.Lock()
+        self._items: deque = deque(maxlen=maxlen)
+
+    def add(self, call: "OutboundCall", error: Exception):
+        with self._lock:
+            self._items.append({
+                "failed_at": datetime.datetime.now(datetime.timezone.utc),
+                "method": getattr(call.func, "__name__", repr(call.func)),
+                "chat_id": call.chat_id,
+                "attempts": call.attempts,
+                "error": repr(error),
+                "call": call,
+            })
+
+    def items(self) -> list[dict]:
+        with self._lock:
+            return list(self._items)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class OutboundCall:
+    """
+    Один отложенный вызов Bot API.
+
+    key     — ключ очереди: вызовы с одинаковым ключом выполняются строго по порядку
+              (chat_id, либо callback_query_id для ответов на callback);
+    chat_id — чат, по которому считается лимит (None — без лимита на чат);
+    lane    — класс приоритета (Lane);
+    edit    — (scope, message_id) для правок, которые можно схлопывать
+              (scope: EDIT_TEXT или EDIT_MARKUP), иначе None.
+    """
+    __slots__ = (
+        "func", "args", "kwargs", "future", "key", "chat_id", "kind", "lane",
+        "edit", "superseded", "enqueued_at", "attempts",
+    )
+
+    # editMessageText задаёт и текст, и клавиатуру; editMessageReplyMarkup — только клавиатуру
+    EDIT_TEXT = "text"
+    EDIT_MARKUP = "markup"
+
+    def __init__(self, func, args, kwargs, key, chat_id, kind, lane=Lane.INTERACTIVE, edit=None):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = concurrent.futures.Future()
+        self.key = key
+        self.chat_id = chat_id
+        self.kind = kind
+        self.lane = lane
+        self.edit = edit
+        # Future вызовов, которые заменил этот: получают его результат
+        self.superseded: list[concurrent.futures.Future] = []
+        self.enqueued_at = time.monotonic()
+        # сколько раз вызов уже повторялся
+        self.attempts = 0
+
+
+class OutboundQueue:
+    """
+    Очередь исходящих вызовов с рабочим потоком и лимитером.
+
+    Для каждого ключа держится своя FIFO-очередь. Если у чата кончились токены,
+    его вызовы откладываются до появления токена, а поток сразу переходит
+    к следующему чату — простаивающие чаты не ждут загруженных.
+    Готовые ключи разложены по классам приоритета (по голове очереди ключа)
+    и выбираются smooth weighted round-robin по Lane.WEIGHTS.
+
+    Вызов, получивший 429, 5xx или сетевую ошибку, возвращается в голову
+    очереди своего ключа и повторяется позже (retry_after либо экспоненциальная
+    задержка с jitter); после OUTBOUND_MAX_RETRIES попадает в DeadLetters.
+
+    Правка сообщения, которая ещё ждёт в очереди, заменяется более новой
+    правкой того же сообщения (см. _coalesce) — до Telegram доходит только
+    последнее состояние, а Future заменённых вызовов получают его результат.
+    """
+
+    def __init__(self, limiter: RateLimiter, stats: LaneStats, dead_letters: DeadLetters,
+                 name: str = "OutboundWorker"):
+        self._limiter = limiter
+        self._stats = stats
+        self._dead_letters = dead_letters
+        self._inbox: queue.Queue = queue.Queue()
+        # key -> deque[OutboundCall]; ключ присутствует, пока у него есть вызовы
+        self._pending: dict = {}
+        # ключи, голову которых можно пробовать выполнить прямо сейчас, по классам приоритета
+        self._ready: dict[int, deque] = {lane: deque() for lane in Lane.ALL}
+        self._credit: dict[int, int] = {lane: 0 for lane in Lane.ALL}
+        # куча (ready_at, seq, key) — ключи, ждущие токенов
+        self._delayed: list = []
+        self._seq = itertools.count()
+        self._stopping = False
+        # проверка _stopping и постановка в _inbox — одно действие относительно stop()
+        self._stop_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True, name=name)
+        self._thread.start()
+
+    def put(self, call: OutboundCall):
+        with self._stop_lock:
+            if not self._stopping:
+                self._inbox.put(call)
+                return
+        self._resolve(call, error=RuntimeError("очередь исходящих вызовов остановлена"))
+
+    def stop(self):
+        """
+        Новые вызовы больше не принимаются; уже поставленные выполняются,
+        после чего рабочий поток завершается.
+        """
+        with self._stop_lock:
+            self._stopping = True
+            # будит поток, если он ждёт в _collect
+            self._inbox.put(None)
+
+    def _accept(self, call: OutboundCall | None):
+        if call is None:
+            return
+        pending = self._pending.get(call.key)
+        if pending is None:
+            self._pending[call.key] = deque([call])
+            self._mark_ready(call.key)
+        else:
+            if call.edit is not None:
+                self._coalesce(pending, call)
+            pending.append(call)
+
+    def _coalesce(self, pending: deque, call: OutboundCall):
+        """
+        Убирает из хвоста очереди ключа правки того же сообщения, которые
+        новая правка полностью перекрывает: правка текста заменяет
+        и текст, и клавиатуру, правка клавиатуры — только клавиатуру.
+        Смотрим лишь на подряд идущие правки в хвосте, поэтому порядок
+        относительно остальных вызовов чата не меняется.
+        """
+        scope, message_id = call.edit
+        while pending:
+            last = pending[-1]
+            if last.edit is None or last.edit[1] != message_id:
+                break
+            if scope == OutboundCall.EDIT_MARKUP and last.edit[0] != OutboundCall.EDIT_MARKUP:
+                break
+            pending.pop()
+            call.superseded.append(last.future)
+            call.superseded.extend(last.superseded)
+            # замена не должна терять ни приоритет, ни время ожидания заменённого вызова
+            call.lane = min(call.lane, last.lane)
+            call.enqueued_at = min(call.enqueued_at, last.enqueued_at)
+            self._stats.record_coalesced(last.lane)
+            logger.debug(f"OutboundQueue: правка {message_id} в chat_id={call.chat_id} заменена более новой")
+
+    def _mark_ready(self, key):
+        self._ready[self._pending[key][0].lane].append(key)
+
+    def _has_ready(self) -> bool:
+        return any(self._ready[lane] for lane in Lane.ALL)
+
+    def _next_ready(self):
+        """
+        Smooth weighted round-robin по непустым классам приоритета.
+        """
+        best = None
+        total = 0
+        for lane in Lane.ALL:
+            if self._ready[lane]:
+                weight = Lane.WEIGHTS[lane]
+                self._credit[lane] += weight
+                total += weight
+                if best is None or self._credit[lane] > self._credit[best]:
+                    best = lane
+        if best is None:
+            return None
+        self._credit[best] -= total
+        return self._ready[best].popleft()
+
+    def _collect(self):
+        """
+        Забирает новые вызовы из входящей очереди. Если выполнять нечего,
+        блокируется до нового вызова или до ближайшего отложенного ключа.
+        """
+        if not self._has_ready():
+            timeout = None
+            if self._delayed:
+                timeout = max(0.0, self._delayed[0][0] - time.monotonic())
+            try:
+                self._accept(self._inbox.get(timeout=timeout))
+            except queue.Empty:
+                pass
+        while True:
+            try:
+                self._accept(self._inbox.get_nowait())
+            except queue.Empty:
+                break
+
+    def _promote_delayed(self):
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, key = heapq.heappop(self._delayed)
+            if key in self._pending:
+                self._mark_ready(key)
+
+    def _run(self):
+        while not (self._stopping and not self._pending and self._inbox.empty()):
+            try:
+                self._collect()
+                self._promote_delayed()
+                key = self._next_ready()
+                if key is None or not self._pending.get(key):
+                    continue
+                head = self._pending[key][0]
+                try:
+                    self._step(key)
+                except Exception as e:
+                    logger.exception(f"OutboundQueue: ошибка при выполнении вызова chat_id={head.chat_id}: {e}")
+                    self._drop_key(key, head, e)
+            except Exception as e:
+                logger.exception(f"OutboundQueue: ошибка рабочего потока: {e}")
+        self._fail_leftovers()
+
+    def _fail_leftovers(self):
+        """Поток завершается: всё, что ещё лежит во входящей очереди, завершается ошибкой."""
+        while True:
+            try:
+                call = self._inbox.get_nowait()
+            except queue.Empty:
+                return
+            if call is not None:
+                self._resolve(call, error=RuntimeError("очередь исходящих вызовов остановлена"))
+
+    def _drop_key(self, key, head: OutboundCall, error: Exception):
+        """
+        Непредвиденная ошибка в _step: состояние очереди ключа неизвестно,
+        поэтому все его вызовы (и взятый в работу head) завершаются ошибкой,
+        а ключ убирается — иначе ждущие их Future зависли бы навсегда.
+        """
+        calls = list(self._pending.pop(key, ()))
+        if head not in calls:
+            calls.append(head)
+        for call in calls:
+            self._resolve(call, error=error)
+        delayed = [item for item in self._delayed if item[2] != key]
+        if len(delayed) != len(self._delayed):
+            heapq.heapify(delayed)
+            self._delayed = delayed
+        for lane in Lane.ALL:
+            if key in self._ready[lane]:
+                self._ready[lane] = deque(k for k in self._ready[lane] if k != key)
+
+    def _step(self, key):
+        pending = self._pending[key]
+        call = pending[0]
+
+        delay = self._limiter.reserve(call.chat_id, call.kind, bulk=call.lane == Lane.BULK)
+        if delay > 0:
+            heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._seq), key))
+            return
+
+        pending.popleft()
+        if call.attempts == 0:
+            self._stats.record(call.lane, time.monotonic() - call.enqueued_at)
+
+        try:
+            result = call.func(*call.args, **call.kwargs)
+        except Exception as e:
+            retry_in = self._retry_delay(call, e)
+            if retry_in is not None:
+                call.attempts += 1
+                logger.warning(
+                    f"OutboundQueue: повтор {call.attempts}/{Constants.OUTBOUND_MAX_RETRIES} "
+                    f"для chat_id={call.chat_id} через {retry_in:.1f}с: {e}"
+                )
+                # вызов остаётся первым в очереди ключа — порядок в чате сохраняется
+                pending.appendleft(call)
+                heapq.heappush(self._delayed, (time.monotonic() + retry_in, next(self._seq), key))
+                return
+            self._resolve(call, error=e)
+        else:
+            self._resolve(call, result=result)
+
+        if pending:
+            self._mark_ready(key)
+        else:
+            del self._pending[key]
+
+    @staticmethod
+    def _resolve(call: OutboundCall, result=None, error: Exception | None = None):
+        for future in (call.future, *call.superseded):
+            # Future мог быть уже отменён вызывающим кодом
+            if future.done():
+                continue
+            try:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+            except concurrent.futures.InvalidStateError:
+                pass
+
+    def _retry_delay(self, call: OutboundCall, error: Exception) -> float | None:
+        """
+        Через сколько секунд повторить вызов, или None — не повторять.
+        """
+        if isinstance(error, ApiTelegramException) and error.error_code == 429:
+            params = error.result_json.get("parameters") or {}
+            delay = float(params.get("retry_after", 1))
+            self._limiter.pause(call.chat_id, delay)
+        elif self._is_transient(error):
+            backoff = min(Constants.OUTBOUND_BACKOFF_MAX, Constants.OUTBOUND_BACKOFF_BASE * 2 ** call.attempts)
+            delay = backoff / 2 + random.uniform(0, backoff / 2)
+        else:
+            return None
+
+        if call.attempts >= Constants.OUTBOUND_MAX_RETRIES:
+            logger.error(f"OutboundQueue: повторы исчерпаны для chat_id={call.chat_id}: {error}")
+            self._dead_letters.add(call, error)
+            return None
+        return delay
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return True
+        if isinstance(error, ApiTelegramException):
+            return error.error_code >= 500
+        if isinstance(error, ApiHTTPException):
+            return getattr(error.result, "status_code", 0) >= 500
+        return False
+
+
+class OutboundPool:
+    """
+    Пул из N очередей-отправителей. Вызовы шардируются по ключу:
+    всё, что адресовано одному чату, попадает в одну очередь и выполняется
+    строго по порядку, а разные чаты обслуживаются параллельно.
+    Лимитер, статистика ожидания и DeadLetters общие для всех очередей.
+    """
+
+    def __init__(self, limiter: RateLimiter, size: int):
+        self.size = max(1, size)
+        self.stats = LaneStats()
+        self.dead_letters = DeadLetters()
+        self._shards = [
+            OutboundQueue(limiter, self.stats, self.dead_letters, name=f"OutboundWorker-{i}")
+            for i in range(self.size)
+        ]
+
+    def put(self, call: OutboundCall):
+        self._shards[hash(call.key) % self.size].put(call)
+
+    def stop(self):
+        for shard in self._shards:
+            shard.stop()
@@ -0,0 +1,682 @@
+import concurrent.futures
+import itertools
+import json
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+import zlib
+
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError, ResponseError
+from telebot.apihelper import ApiTelegramException
+from telebot.types import InlineKeyboardMarkup, LinkPreviewOptions, Message, MessageEntity, ReplyParameters
+
+from tgbot.logics.constants import Constants
+from tgbot.outbound import OutboundCall, OutboundPool
+from tgbot.rate_limiter import RateLimiter
+
+from pathlib import Path
+from loguru import logger
+
+Path("logs").mkdir(parents=True, exist_ok=True)
+
+log_filename = Path("logs") / f"{Path(__file__).stem}.log"
+logger.add(str(log_filename), rotation="10 MB", level="INFO")
+
+
+# Token bucket для нескольких ключей сразу, атомарно на стороне Redis.
+# KEYS[1], KEYS[2] — ключи пауз после 429 (общая и чата), дальше — бакеты.
+# ARGV — пары (rate, capacity) для каждого бакета.
+# Возвращает строку: "0" — токены списаны, иначе — сколько секунд ждать.
+_TOKEN_BUCKET_LUA = """
+local pause = math.max(redis.call('PTTL', KEYS[1]), redis.call('PTTL', KEYS[2]))
+if pause > 0 then
+    return tostring(pause / 1000)
+end
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local delay = 0
+local tokens = {}
+for i = 3, #KEYS do
+    local rate = tonumber(ARGV[2 * (i - 2) - 1])
+    local capacity = tonumber(ARGV[2 * (i - 2)])
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local value = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    value = math.min(capacity, value + math.max(0, now - ts) * rate)
+    tokens[i] = value
+    if value < 1 then
+        delay = math.max(delay, (1 - value) / rate)
+    end
+end
+if delay > 0 then
+    return tostring(delay)
+end
+
+for i = 3, #KEYS do
+    local rate = tonumber(ARGV[2 * (i - 2) - 1])
+    local capacity = tonumber(ARGV[2 * (i - 2)])
+    redis.call('HSET', KEYS[i], 'tokens', tokens[i] - 1, 'ts', now)
+    redis.call('EXPIRE', KEYS[i], math.ceil(capacity / rate) + 1)
+end
+return '0'
+"""
+
+
+class RedisRateLimiter(RateLimiter):
+    """
+    Те же лимиты, что у RateLimiter, но бакеты и паузы после 429 лежат в Redis,
+    поэтому бюджет общий для всех воркеров кластера.
+
+    Пока Redis недоступен, лимиты считаются локально (родительский RateLimiter):
+    вызовы продолжают выполняться, а не падают вместе с очередью.
+    """
+
+    def __init__(self, bot_id: str):
+        super().__init__()
+        self._prefix = f"{Constants.OUTBOUND_REDIS_PREFIX}:{bot_id}"
+        self._redis = get_redis_connection("default")
+        self._script = self._redis.register_script(_TOKEN_BUCKET_LUA)
+        self._redis_down = False
+
+    def _fallback(self, error: Exception):
+        if not self._redis_down:
+            self._redis_down = True
+            logger.warning(f"RedisRateLimiter: Redis недоступен, лимиты считаются локально: {error}")
+
+    def _recovered(self):
+        if self._redis_down:
+            self._redis_down = False
+            logger.info("RedisRateLimiter: Redis снова доступен")
+
+    def _pause_key(self, chat_id: int | None) -> str:
+        return f"{self._prefix}:pause:{'global' if chat_id is None else chat_id}"
+
+    def reserve(self, chat_id: int | None, kind: str, bulk: bool = False) -> float:
+        if kind not in self._global:
+            return 0.0
+
+        keys = [self._pause_key(None), self._pause_key(chat_id)]
+        args = []
+
+        def add(name, bucket):
+            keys.append(f"{self._prefix}:bucket:{name}")
+            args.extend((bucket.rate, bucket.capacity))
+
+        add(kind, self._global[kind])
+        if bulk:
+            add("bulk", self._bulk)
+        if chat_id is not None:
+            add(f"{kind}:{chat_id}", self._new_chat_bucket(kind, chat_id))
+
+        try:
+            delay = float(self._script(keys=keys, args=args))
+        except RedisError as e:
+            self._fallback(e)
+            return super().reserve(chat_id, kind, bulk)
+        self._recovered()
+        return delay
+
+    def pause(self, chat_id: int | None, seconds: float):
+        super().pause(chat_id, seconds)
+        ms = int(seconds * 1000)
+        if ms <= 0:
+            return
+        pipe = self._redis.pipeline()
+        if chat_id is not None:
+            pipe.set(self._pause_key(chat_id), 1, px=ms)
+        # если локальный лимитер решил, что превышен общий лимит, — пауза на весь кластер
+        if chat_id is None or self._paused_until > time.monotonic():
+            pipe.set(self._pause_key(None), 1, px=ms)
+        try:
+            pipe.execute()
+        except RedisError as e:
+            # локальная пауза уже выставлена выше
+            self._fallback(e)
+
+
+class _RemoteError(Exception):
+    """Ошибка с другого воркера, которую не удалось передать как есть."""
+
+
+# Типы telebot, которые могут ехать через stream: аргументы вызовов и результаты.
+# Только JSON и только этот список — из Redis не восстанавливается произвольный объект.
+_WIRE_TYPES = {cls.__name__: cls for cls in (
+    InlineKeyboardMarkup, LinkPreviewOptions, Message, MessageEntity, ReplyParameters,
+)}
+
+
+def _encode(value):
+    """
+    Значение -> JSON-совместимая структура. Объекты telebot из _WIRE_TYPES
+    пишутся как {"__tg__": имя, "v": dict}; всё остальное — TypeError.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if isinstance(value, dict):
+        if not all(isinstance(key, str) for key in value):
+            raise TypeError("ключи словаря должны быть строками")
+        return {key: _encode(item) for key, item in value.items()}
+    name = type(value).__name__
+    if _WIRE_TYPES.get(name) is type(value):
+        return {"__tg__": name, "v": value.json if isinstance(value, Message) else value.to_dict()}
+    raise TypeError(f"{name} не передаётся через stream")
+
+
+def _decode(value):
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    if isinstance(value, dict):
+        name = value.get("__tg__")
+        if name is not None:
+            return _WIRE_TYPES[name].de_json(value["v"])
+        return {key: _decode(item) for key, item in value.items()}
+    return value
+
+
+def _pack_error(error: Exception) -> dict:
+    return {
+        "type": type(error).__name__,
+        "description": str(error),
+        "error_code": getattr(error, "error_code", None),
+        "function": getattr(error, "function_name", None),
+        "result_json": getattr(error, "result_json", None) if isinstance(error, ApiTelegramException) else None,
+    }
+
+
+def _unpack_error(packed: dict) -> Exception:
+    if packed.get("type") == ApiTelegramException.__name__ and packed.get("result_json"):
+        return ApiTelegramException(packed.get("function"), None, packed["result_json"])
+    return _RemoteError(f"{packed.get('type')}: {packed.get('description')}")
+
+
+# Продление и снятие аренды партиции — только если она всё ещё наша.
+_RENEW_LEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_LEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class _Tail:
+    """Последний вызов чата, отправленный с этого воркера: куда ушёл и ушёл ли уже."""
+    __slots__ = ("remote", "future", "sent")
+
+    def __init__(self, remote: bool, future: concurrent.futures.Future):
+        self.remote = remote
+        self.future = future
+        self.sent = threading.Event()
+
+
+class RedisOutbound:
+    """
+    Распределённый режим очереди исходящих вызовов (Constants.OUTBOUND_DISTRIBUTED).
+
+    Вызовы сериализуются в Redis streams бота и выполняются OutboundPool
+    того воркера, который их прочитал, с общим RedisRateLimiter. Результат
+    возвращается в список ответов воркера-отправителя, где слушатель разрешает
+    исходный Future — поэтому send_message и прочие обёртки SyncBot сохраняют
+    прежние сигнатуры и возвращаемые значения.
+
+    Порядок вызовов одного чата. Stream разбит на OUTBOUND_STREAM_PARTITIONS
+    партиций по chat_id, и каждую партицию в любой момент читает только один
+    воркер — тот, у кого её аренда (ключ с TTL OUTBOUND_PARTITION_LEASE,
+    продлевается в _heartbeat). Он кладёт записи в свой пул в порядке stream,
+    а пул выполняет вызовы одного ключа строго по очереди. Партиции делятся
+    между живыми воркерами поровну; новый владелец сначала забирает
+    неподтверждённые записи прежнего, потом читает новые.
+
+    Вызов, который нельзя отправить в stream (аргументы не сериализуются,
+    RedisOutbound закрыт), выполняется локально — но не раньше, чем завершатся
+    отправленные в stream предыдущие вызовы того же чата, и наоборот (см. _Tail).
+
+    Ответ, не пришедший за OUTBOUND_REPLY_TIMEOUT, завершает Future ошибкой.
+    """
+
+    GROUP = "outbound"
+
+    def __init__(self, bot, pool: OutboundPool, bot_id: str):
+        self._bot = bot
+        self._pool = pool
+        self._redis = get_redis_connection("default")
+        self._prefix = f"{Constants.OUTBOUND_REDIS_PREFIX}:{bot_id}"
+        self._partitions = max(1, Constants.OUTBOUND_STREAM_PARTITIONS)
+        self._consumers_key = f"{self._prefix}:consumers"
+        self._consumer = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._reply_key = f"{self._prefix}:reply:{self._consumer}"
+        self._renew_lease = self._redis.register_script(_RENEW_LEASE_LUA)
+        self._release_lease = self._redis.register_script(_RELEASE_LEASE_LUA)
+
+        self._lock = threading.Lock()
+        # call_id -> (Future, срок ожидания ответа по time.monotonic())
+        self._waiting: dict[int, tuple[concurrent.futures.Future, float]] = {}
+        self._ids = itertools.count()
+        # ключ порядка (chat_id) -> _Tail последнего вызова чата
+        self._tails: dict = {}
+        self._in_flight = threading.BoundedSemaphore(Constants.OUTBOUND_STREAM_MAX_IN_FLIGHT)
+        # партиции, аренда которых у этого воркера
+        self._owned: set[int] = set()
+        # партиции, полученные с тех пор, как их читал _consume: сначала забрать записи прежнего владельца
+        self._acquired: set[int] = set()
+        # партиции, которые больше не читаются и будут отданы, когда их записи выполнятся
+        self._draining: set[int] = set()
+        # (партиция, id записи), полученные этим процессом и ещё не подтверждённые
+        self._running: set = set()
+        # выполненные записи, XACK которых не удался, — подтверждаются повторно
+        self._unacked: set = set()
+        # _stop — новые записи больше не читаются; _closed — завершились все потоки
+        self._stop = threading.Event()
+        self._closed = threading.Event()
+
+        for partition in range(self._partitions):
+            self._ensure_group(self._stream(partition))
+        threading.Thread(target=self._heartbeat, daemon=True, name="OutboundStreamHeartbeat").start()
+        threading.Thread(target=self._consume, daemon=True, name="OutboundStreamConsumer").start()
+        threading.Thread(target=self._listen_replies, daemon=True, name="OutboundReplyListener").start()
+
+    def _stream(self, partition: int) -> str:
+        return f"{self._prefix}:stream:{partition}"
+
+    def _lease_key(self, partition: int) -> str:
+        return f"{self._prefix}:owner:{partition}"
+
+    def _partition_of(self, order_key) -> int:
+        # hash() строк меняется от процесса к процессу, нужен устойчивый
+        return zlib.crc32(str(order_key).encode()) % self._partitions
+
+    @staticmethod
+    def _order_key(call: OutboundCall):
+        return call.chat_id if call.chat_id is not None else call.key
+
+    def _ensure_group(self, stream: str):
+        try:
+            self._redis.xgroup_create(stream, self.GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def close(self):
+        """
+        Прекращает чтение stream и в фоне дожидается уже принятых записей
+        и ответов на свои вызовы (не дольше OUTBOUND_REPLY_TIMEOUT),
+        отдавая освободившиеся партиции, после чего останавливает потоки.
+        Новые вызовы после close() выполняются через локальный пул.
+        """
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        try:
+            self._redis.zrem(self._consumers_key, self._consumer)
+        except Exception as e:
+            logger.warning(f"RedisOutbound: не удалось убрать consumer {self._consumer}: {e}")
+        threading.Thread(target=self._drain, daemon=True, name="OutboundStreamClose").start()
+
+    def _drain(self):
+        deadline = time.monotonic() + Constants.OUTBOUND_REPLY_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                self._retry_acks()
+            except Exception as e:
+                logger.warning(f"RedisOutbound: XACK при остановке не удался: {e}")
+            with self._lock:
+                if not (self._running or self._unacked or self._waiting):
+                    break
+            time.sleep(0.5)
+        self._closed.set()
+
+        with self._lock:
+            futures = [future for future, _ in self._waiting.values()]
+            self._waiting.clear()
+            leftover = bool(self._running or self._unacked)
+            owned = self._owned | self._draining
+            self._owned, self._draining = set(), set()
+        for future in futures:
+            if not future.done():
+                future.set_exception(RuntimeError("RedisOutbound закрыт до получения ответа"))
+        # незавершённые записи остаются в группе: их заберёт следующий владелец партиции
+        for partition in owned:
+            try:
+                self._release_lease(keys=[self._lease_key(partition)], args=[self._consumer])
+                if not leftover:
+                    self._redis.xgroup_delconsumer(self._stream(partition), self.GROUP, self._consumer)
+            except Exception as e:
+                logger.warning(f"RedisOutbound: не удалось отдать партицию {partition}: {e}")
+        logger.info(f"RedisOutbound: consumer {self._consumer} остановлен")
+
+    # --- сторона отправителя ---
+    def submit(self, call: OutboundCall) -> concurrent.futures.Future:
+        """
+        Публикует вызов в stream партиции его чата. Если аргументы
+        не сериализуются (например, открытый файл) или RedisOutbound закрыт,
+        вызов выполняется локально; порядок с вызовами чата, ушедшими
+        другим путём, сохраняется ожиданием их завершения.
+        """
+        call_id = next(self._ids)
+        payload = None
+        if not self._stop.is_set():
+            try:
+                payload = json.dumps({
+                    "id": call_id,
+                    "reply": self._reply_key,
+                    "method": call.func.__name__,
+                    "args": _encode(call.args),
+                    "kwargs": _encode(call.kwargs),
+                    "key": call.key,
+                    "chat_id": call.chat_id,
+                    "kind": call.kind,
+                    "lane": call.lane,
+                    "edit": call.edit,
+                })
+            except (TypeError, ValueError) as e:
+                logger.debug(f"RedisOutbound: вызов не сериализуется, выполняем локально: {e}")
+
+        order_key = self._order_key(call)
+        tail = _Tail(payload is not None, call.future)
+        with self._lock:
+            previous = self._tails.get(order_key)
+            self._tails[order_key] = tail
+        call.future.add_done_callback(lambda _: self._drop_tail(order_key, tail))
+
+        if previous is not None and not previous.future.done() and (
+                previous.remote != tail.remote or not previous.sent.is_set()):
+            # предыдущий вызов чата ушёл другим путём (или ещё не ушёл) — ждём его
+            previous.future.add_done_callback(
+                lambda _: self._dispatch(call, call_id, payload, order_key, tail, None)
+            )
+        else:
+            self._dispatch(call, call_id, payload, order_key, tail, previous)
+        return call.future
+
+    def _drop_tail(self, order_key, tail: _Tail):
+        with self._lock:
+            if self._tails.get(order_key) is tail:
+                del self._tails[order_key]
+
+    def _dispatch(self, call: OutboundCall, call_id: int, payload: str | None, order_key,
+                  tail: _Tail, previous: _Tail | None):
+        try:
+            if payload is None:
+                self._pool.put(call)
+                return
+            with self._lock:
+                self._waiting[call_id] = (call.future, time.monotonic() + Constants.OUTBOUND_REPLY_TIMEOUT)
+            try:
+                self._redis.xadd(
+                    self._stream(self._partition_of(order_key)), {"call": payload},
+                    maxlen=Constants.OUTBOUND_STREAM_MAXLEN, approximate=True
+                )
+            except Exception as e:
+                with self._lock:
+                    self._waiting.pop(call_id, None)
+                if previous is not None and not previous.future.done():
+                    # локально вызов обогнал бы ещё не выполненные вызовы чата из stream
+                    logger.error(f"RedisOutbound: stream недоступен, вызов chat_id={call.chat_id} не отправлен: {e}")
+                    call.future.set_exception(e)
+                    return
+                logger.warning(f"RedisOutbound: stream недоступен, выполняем вызов локально: {e}")
+                self._pool.put(call)
+        finally:
+            tail.sent.set()
+
+    def _expire_waiting(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [call_id for call_id, (_, deadline) in self._waiting.items() if deadline <= now]
+            futures = [self._waiting.pop(call_id)[0] for call_id in expired]
+        for future in futures:
+            if not future.done():
+                future.set_exception(TimeoutError("нет ответа от исполнителя вызова"))
+        if futures:
+            logger.error(f"RedisOutbound: не дождались ответа на {len(futures)} вызовов")
+
+    def _listen_replies(self):
+        while not self._closed.is_set():
+            try:
+                self._expire_waiting()
+                item = self._redis.blpop([self._reply_key], timeout=5)
+                if item is None:
+                    continue
+                reply = json.loads(item[1])
+                with self._lock:
+                    future, _ = self._waiting.pop(reply["id"], (None, None))
+                if future is None or future.done():
+                    continue
+                if reply["ok"]:
+                    future.set_result(_decode(reply["result"]))
+                else:
+                    future.set_exception(_unpack_error(reply["error"]))
+            except Exception as e:
+                logger.exception(f"RedisOutbound: ошибка слушателя ответов: {e}")
+                time.sleep(1)
+
+    # --- сторона исполнителя ---
+    def _heartbeat(self):
+        """
+        Продлевает аренду своих партиций и делит партиции между живыми
+        воркерами: берёт свободные, пока их меньше своей доли, а лишние
+        перестаёт читать и отдаёт, когда их записи выполнятся.
+        """
+        while True:
+            try:
+                self._rebalance()
+            except Exception as e:
+                logger.warning(f"RedisOutbound: ошибка распределения партиций: {e}")
+            if self._closed.wait(Constants.OUTBOUND_PARTITION_LEASE / 3):
+                return
+
+    def _rebalance(self):
+        lease_ms = int(Constants.OUTBOUND_PARTITION_LEASE * 1000)
+        with self._lock:
+            held = sorted(self._owned | self._draining)
+        lost = [
+            partition for partition in held
+            if not self._renew_lease(keys=[self._lease_key(partition)], args=[self._consumer, lease_ms])
+        ]
+        if lost:
+            logger.warning(f"RedisOutbound: аренда партиций {lost} потеряна")
+            with self._lock:
+                self._owned.difference_update(lost)
+                self._acquired.difference_update(lost)
+                self._draining.difference_update(lost)
+
+        if self._stop.is_set():
+            share = 0
+        else:
+            now = time.time()
+            pipe = self._redis.pipeline()
+            pipe.zadd(self._consumers_key, {self._consumer: now})
+            pipe.zremrangebyscore(self._consumers_key, "-inf", now - Constants.OUTBOUND_PARTITION_LEASE)
+            pipe.zcard(self._consumers_key)
+            share = -(-self._partitions // max(1, pipe.execute()[2]))
+
+        with self._lock:
+            held = self._owned | self._draining
+            busy = {partition for partition, _ in self._running | self._unacked}
+            if len(self._owned) > share:
+                # лишние партиции больше не читаются (_run_entries их не возьмёт)
+                # и отдаются, когда в них ничего не выполняется; сначала — свободные
+                extra = sorted(self._owned, key=lambda partition: (partition in busy, partition))
+                moved = extra[:len(self._owned) - share]
+                self._owned.difference_update(moved)
+                self._acquired.difference_update(moved)
+                self._draining.update(moved)
+            released = sorted(self._draining - busy)
+            self._draining.difference_update(released)
+            missing = share - len(self._owned)
+
+        for partition in released:
+            self._release_lease(keys=[self._lease_key(partition)], args=[self._consumer])
+        if released:
+            logger.info(f"RedisOutbound: {self._consumer} отдал партиции {released}")
+
+        if missing > 0:
+            acquired = []
+            start = random.randrange(self._partitions)
+            for i in range(self._partitions):
+                partition = (start + i) % self._partitions
+                if len(acquired) >= missing:
+                    break
+                if partition not in held and self._redis.set(
+                        self._lease_key(partition), self._consumer, nx=True, px=lease_ms):
+                    acquired.append(partition)
+            if acquired:
+                with self._lock:
+                    self._owned.update(acquired)
+                    self._acquired.update(acquired)
+                logger.info(f"RedisOutbound: {self._consumer} получил партиции {sorted(acquired)}")
+
+    def _consume(self):
+        while not self._stop.is_set():
+            try:
+                self._retry_acks()
+                with self._lock:
+                    owned = sorted(self._owned)
+                    acquired, self._acquired = self._acquired, set()
+                if not owned:
+                    self._stop.wait(1)
+                    continue
+
+                for partition in sorted(acquired):
+                    # записи, полученные прежним владельцем и не подтверждённые им
+                    self._run_entries(partition, self._claim_all(partition))
+
+                response = self._redis.xreadgroup(
+                    self.GROUP, self._consumer, {self._stream(p): ">" for p in owned},
+                    count=Constants.OUTBOUND_STREAM_BATCH, block=1000
+                )
+                for stream, stream_entries in response or ():
+                    if isinstance(stream, bytes):
+                        stream = stream.decode()
+                    self._run_entries(int(stream.rsplit(":", 1)[1]), stream_entries)
+            except Exception as e:
+                logger.exception(f"RedisOutbound: ошибка чтения stream: {e}")
+                time.sleep(1)
+
+    def _claim_all(self, partition: int) -> list:
+        entries = []
+        start = "0-0"
+        while True:
+            claimed = self._redis.xautoclaim(
+                self._stream(partition), self.GROUP, self._consumer,
+                min_idle_time=0, start_id=start, count=Constants.OUTBOUND_STREAM_BATCH,
+            )
+            entries.extend(claimed[1])
+            start = claimed[0]
+            if start in (b"0-0", "0-0"):
+                return entries
+
+    def _run_entries(self, partition: int, entries):
+        fresh = []
+        with self._lock:
+            if partition not in self._owned:
+                # аренда потеряна: записи прочитает новый владелец
+                return
+            for entry_id, fields in entries:
+                entry = (partition, entry_id)
+                # своя запись, которая ещё выполняется или уже выполнена, — не повторяем
+                if entry in self._running or entry in self._unacked:
+                    continue
+                self._running.add(entry)
+                fresh.append((entry, fields))
+        for entry, fields in fresh:
+            if self._stop.is_set():
+                # не начатая запись достанется следующему владельцу партиции
+                with self._lock:
+                    self._running.discard(entry)
+            elif fields:
+                self._execute_entry(entry, fields)
+            else:
+                # запись удалена из stream (MAXLEN) — выполнять нечего, только подтверждаем
+                self._ack(entry)
+
+    def _ack(self, entry):
+        partition, entry_id = entry
+        try:
+            self._redis.xack(self._stream(partition), self.GROUP, entry_id)
+        except Exception as e:
+            logger.warning(f"RedisOutbound: XACK {entry_id} не удался, повторим: {e}")
+            with self._lock:
+                self._unacked.add(entry)
+        finally:
+            with self._lock:
+                self._running.discard(entry)
+
+    def _retry_acks(self):
+        with self._lock:
+            entries = list(self._unacked)
+        if not entries:
+            return
+        by_partition: dict[int, list] = {}
+        for partition, entry_id in entries:
+            by_partition.setdefault(partition, []).append(entry_id)
+        pipe = self._redis.pipeline()
+        for partition, entry_ids in by_partition.items():
+            pipe.xack(self._stream(partition), self.GROUP, *entry_ids)
+        pipe.execute()
+        with self._lock:
+            self._unacked.difference_update(entries)
+
+    def _execute_entry(self, entry, fields: dict):
+        try:
+            data = json.loads(fields[b"call"])
+            call_id, reply_key, method = data["id"], data["reply"], data["method"]
+            # выполняются только обёртки SyncBot._do_*, а не любой атрибут бота
+            if not method.startswith("_do_"):
+                raise ValueError(f"недопустимый метод {method}")
+            func = getattr(self._bot, method)
+            args = tuple(_decode(data["args"]))
+            kwargs = _decode(data["kwargs"])
+            edit = tuple(data["edit"]) if data["edit"] is not None else None
+        except Exception as e:
+            logger.error(f"RedisOutbound: повреждённая запись {entry[1]}: {e}")
+            self._ack(entry)
+            return
+
+        self._in_flight.acquire()
+        call = OutboundCall(func, args, kwargs, data["key"], data["chat_id"], data["kind"], data["lane"], edit)
+        call.future.add_done_callback(
+            lambda future: self._reply(entry, call_id, reply_key, future)
+        )
+        self._pool.put(call)
+
+    def _reply(self, entry, call_id, reply_key, future: concurrent.futures.Future):
+        try:
+            error = future.exception()
+            if error is None:
+                try:
+                    reply = json.dumps({"id": call_id, "ok": True, "result": _encode(future.result())})
+                except (TypeError, ValueError) as e:
+                    logger.warning(f"RedisOutbound: результат {entry[1]} не сериализуется, вернём None: {e}")
+                    reply = json.dumps({"id": call_id, "ok": True, "result": None})
+            else:
+                reply = json.dumps({"id": call_id, "ok": False, "error": _pack_error(error)})
+            pipe = self._redis.pipeline()
+            pipe.rpush(reply_key, reply)
+            pipe.expire(reply_key, Constants.OUTBOUND_REPLY_TTL)
+            pipe.execute()
+        except Exception as e:
+            # отправитель получит TimeoutError по OUTBOUND_REPLY_TIMEOUT
+            logger.exception(f"RedisOutbound: не удалось вернуть результат {entry[1]}: {e}")
+        finally:
+            # вызов выполнен: запись подтверждается в любом случае, иначе её выполнят повторно
+            self._ack(entry)
+            self._in_flight.release()
+
+
+def bot_id_from_token(token: str) -> str:
+    return token.split(":", 1)[0]
+
@@ -0,0 +1,186 @@
+import concurrent.futures
+import datetime
+import threading
+
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from tgbot.models import OutboxMessage, TelegramUser
+from tgbot.logics.constants import Constants
+
+from pathlib import Path
+from loguru import logger
+
+Path("logs").mkdir(parents=True, exist_ok=True)
+
+log_filename = Path("logs") / f"{Path(__file__).stem}.log"
+logger.add(str(log_filename), rotation="10 MB", level="INFO")
+
+
+# --- действия outbox: имя -> функция(**payload) ---
+_ACTIONS = {}
+
+
+def action(name: str):
+    """
+    Регистрирует функцию, которая выполняет запись outbox с данным action.
+    Функция получает payload как именованные аргументы и должна быть
+    безопасна для повтора: доставка «хотя бы один раз».
+    """
+    def decorator(func):
+        _ACTIONS[name] = func
+        return func
+    return decorator
+
+
+def _bot():
+    # бот берётся заново для каждой записи: после reload_bots() это уже новый экземпляр
+    from tgbot.dispatcher import get_main_bot
+    return get_main_bot()
+
+
+@action("send_message")
+def _send_message(chat_id: int, text: str, **kwargs):
+    _bot().send_message(chat_id, text, **kwargs)
+
+
+@action("int_fact_today")
+def _int_fact_today(user_id: int):
+    from tgbot.logics.messages import SendMessages
+
+    user = TelegramUser.objects.filter(pk=user_id).first()
+    if user is None:
+        return
+    SendMessages.IntFacts.today(user, True)
+
+
+# --- постановка в очередь ---
+def enqueue(action_name: str, idempotency_key: str, **payload) -> bool:
+    """
+    Добавляет запись в outbox. Повтор с тем же ключом ничего не делает.
+    Возвращает True, если запись создана.
+    """
+    _, created = OutboxMessage.objects.get_or_create(
+        idempotency_key=idempotency_key,
+        defaults={"action": action_name, "payload": payload},
+    )
+    return created
+
+
+def enqueue_many(items) -> int:
+    """
+    Пакетная постановка: items — итерируемое из (action, idempotency_key, payload).
+    Записи с уже существующими ключами пропускаются. Возвращает число переданных записей.
+    """
+    rows = [
+        OutboxMessage(action=action_name, idempotency_key=key, payload=payload)
+        for action_name, key, payload in items
+    ]
+    OutboxMessage.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+    return len(rows)
+
+
+# --- отправка ---
+class OutboxRelay:
+    """
+    Фоновый поток, который отправляет записи outbox.
+
+    Записи забираются пачкой через SELECT ... FOR UPDATE SKIP LOCKED
+    и «арендуются» на Constants.OUTBOX_LEASE секунд (available_at сдвигается
+    вперёд), поэтому relay может работать в каждом воркере одновременно.
+    Успешная запись помечается sent; при ошибке — повтор через
+    OUTBOX_RETRY_DELAY * attempts, после OUTBOX_MAX_ATTEMPTS — failed.
+
+    Если процесс остановился посреди пачки, неподтверждённые записи
+    снова станут доступны после окончания аренды — так рассылка
+    продолжается после деплоя или перезагрузки конфигурации.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=Constants.OUTBOX_CONCURRENCY, thread_name_prefix="OutboxSender"
+        )
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="OutboxRelay")
+            self._thread.start()
+            logger.info("OutboxRelay: запущен")
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                close_old_connections()
+                batch = self._claim()
+                if not batch:
+                    self._stop.wait(Constants.OUTBOX_POLL_INTERVAL)
+                    continue
+                futures = [self._executor.submit(self._deliver, item) for item in batch]
+                concurrent.futures.wait(futures)
+            except Exception as e:
+                logger.exception(f"OutboxRelay: ошибка цикла: {e}")
+                self._stop.wait(Constants.OUTBOX_POLL_INTERVAL)
+
+    @staticmethod
+    def _claim() -> list[OutboxMessage]:
+        now = timezone.now()
+        with transaction.atomic():
+            batch = list(
+                OutboxMessage.objects
+                .select_for_update(skip_locked=True)
+                .filter(status=OutboxMessage.STATUS_PENDING, available_at__lte=now)
+                .order_by("id")[:Constants.OUTBOX_BATCH]
+            )
+            if batch:
+                OutboxMessage.objects.filter(pk__in=[item.pk for item in batch]).update(
+                    available_at=now + datetime.timedelta(seconds=Constants.OUTBOX_LEASE),
+                    attempts=F("attempts") + 1,
+                )
+        for item in batch:
+            item.attempts += 1
+        return batch
+
+    @staticmethod
+    def _deliver(item: OutboxMessage):
+        try:
+            func = _ACTIONS.get(item.action)
+            if func is None:
+                raise LookupError(f"неизвестное действие outbox: {item.action}")
+            # рассылки идут низким приоритетом, чтобы не задерживать ответы пользователям
+            with _bot().bulk_lane():
+                func(**item.payload)
+        except Exception as e:
+            OutboxRelay._fail(item, e)
+        else:
+            OutboxMessage.objects.filter(pk=item.pk).update(
+                status=OutboxMessage.STATUS_SENT, sent_at=timezone.now(), last_error=""
+            )
+        finally:
+            close_old_connections()
+
+    @staticmethod
+    def _fail(item: OutboxMessage, error: Exception):
+        if item.attempts >= Constants.OUTBOX_MAX_ATTEMPTS:
+            logger.error(f"OutboxRelay: {item} не отправлено после {item.attempts} попыток: {error}")
+            OutboxMessage.objects.filter(pk=item.pk).update(
+                status=OutboxMessage.STATUS_FAILED, last_error=str(error)
+            )
+            return
+        delay = Constants.OUTBOX_RETRY_DELAY * item.attempts
+        logger.warning(f"OutboxRelay: {item} — ошибка, повтор через {delay} с: {error}")
+        OutboxMessage.objects.filter(pk=item.pk).update(
+            available_at=timezone.now() + datetime.timedelta(seconds=delay), last_error=str(error)
+        )
+
+
+outbox_relay = OutboxRelay()
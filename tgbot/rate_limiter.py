@@ -0,0 +1,169 @@
+import threading
+import time
+
+from tgbot.logics.constants import Constants
+
+
+class CallKind:
+    """
+    Класс исходящего вызова Bot API — определяет, из какого бюджета он тратит токены.
+    """
+    # sendMessage, sendPhoto, sendMediaGroup и т.д.
+    SEND = "send"
+    # editMessage*, deleteMessage(s) — отдельный бюджет
+    EDIT = "edit"
+    # answerCallbackQuery — не лимитируется
+    ANSWER = "answer"
+
+
+class TokenBucket:
+    """
+    Token bucket: не более capacity токенов, пополнение rate токенов в секунду.
+    Сам по себе не потокобезопасен — синхронизацию обеспечивает RateLimiter.
+    """
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+
+    def delay(self, now: float) -> float:
+        """
+        Сколько секунд осталось до появления целого токена (0 — токен есть сейчас).
+        """
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+    def is_idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class RateLimiter:
+    """
+    Лимиты Telegram Bot API для исходящих вызовов:
+    - общий бюджет на отправку сообщений (~30/с на бота);
+    - бюджет на чат: 1/с для личных чатов, 20/мин для групп;
+    - отдельный бюджет (общий и на чат) для редактирования и удаления;
+    - массовые рассылки дополнительно ограничены RATE_LIMIT_BULK_PER_SEC,
+      чтобы у интерактивных ответов всегда оставался запас общего бюджета.
+    """
+
+    # Как часто чистить бакеты простаивающих чатов
+    PRUNE_EVERY = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._global = {
+            CallKind.SEND: TokenBucket(Constants.RATE_LIMIT_GLOBAL_PER_SEC, Constants.RATE_LIMIT_GLOBAL_PER_SEC),
+            CallKind.EDIT: TokenBucket(Constants.RATE_LIMIT_EDIT_PER_SEC, Constants.RATE_LIMIT_EDIT_PER_SEC),
+        }
+        self._bulk = TokenBucket(Constants.RATE_LIMIT_BULK_PER_SEC, Constants.RATE_LIMIT_BULK_PER_SEC)
+        # (kind, chat_id) -> TokenBucket
+        self._chats: dict[tuple[str, int], TokenBucket] = {}
+        self._reserved = 0
+        # паузы после 429: chat_id -> monotonic-время окончания; общая пауза отдельно
+        self._paused_chats: dict[int, float] = {}
+        self._paused_until = 0.0
+        # недавние 429 по чатам: chat_id -> время получения
+        self._recent_429: dict[int, float] = {}
+
+    @staticmethod
+    def _new_chat_bucket(kind: str, chat_id: int) -> TokenBucket:
+        if kind == CallKind.EDIT:
+            return TokenBucket(Constants.RATE_LIMIT_EDIT_CHAT_PER_SEC, Constants.RATE_LIMIT_EDIT_CHAT_BURST)
+        # отрицательные chat_id — группы и каналы
+        if chat_id < 0:
+            return TokenBucket(Constants.RATE_LIMIT_GROUP_CHAT_PER_MIN / 60, 1)
+        return TokenBucket(Constants.RATE_LIMIT_PRIVATE_CHAT_PER_SEC, Constants.RATE_LIMIT_PRIVATE_CHAT_BURST)
+
+    def reserve(self, chat_id: int | None, kind: str, bulk: bool = False) -> float:
+        """
+        Пытается списать по токену из всех бакетов, которые касаются вызова.
+        Списание атомарно: либо токены есть везде и возвращается 0,
+        либо ничего не списывается и возвращается время ожидания в секундах.
+        """
+        if kind not in self._global:
+            return 0.0
+
+        now = time.monotonic()
+        with self._lock:
+            pause = self._pause_left(chat_id, now)
+            if pause > 0:
+                return pause
+
+            buckets = [self._global[kind]]
+            if bulk:
+                buckets.append(self._bulk)
+            if chat_id is not None:
+                key = (kind, chat_id)
+                bucket = self._chats.get(key)
+                if bucket is None:
+                    bucket = self._chats[key] = self._new_chat_bucket(kind, chat_id)
+                buckets.append(bucket)
+
+            delay = max(b.delay(now) for b in buckets)
+            if delay > 0:
+                return delay
+
+            for b in buckets:
+                b.consume()
+
+            self._reserved += 1
+            if self._reserved % self.PRUNE_EVERY == 0:
+                self._prune(now)
+            return 0.0
+
+    def _pause_left(self, chat_id: int | None, now: float) -> float:
+        left = self._paused_until - now
+        if chat_id is not None:
+            until = self._paused_chats.get(chat_id)
+            if until is not None:
+                if until <= now:
+                    del self._paused_chats[chat_id]
+                else:
+                    left = max(left, until - now)
+        return max(left, 0.0)
+
+    def pause(self, chat_id: int | None, seconds: float):
+        """
+        Останавливает вызовы после 429 с retry_after.
+
+        Telegram не сообщает, какой лимит превышен, поэтому по умолчанию
+        ставится на паузу только чат. Если 429 пришли сразу по нескольким
+        разным чатам (или у вызова нет чата) — превышен общий лимит,
+        и пауза распространяется на все вызовы.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if chat_id is None:
+                self._paused_until = max(self._paused_until, now + seconds)
+                return
+
+            self._paused_chats[chat_id] = max(self._paused_chats.get(chat_id, 0.0), now + seconds)
+
+            window = Constants.RATE_LIMIT_GLOBAL_429_WINDOW
+            self._recent_429 = {c: t for c, t in self._recent_429.items() if now - t <= window}
+            self._recent_429[chat_id] = now
+            if len(self._recent_429) >= Constants.RATE_LIMIT_GLOBAL_429_CHATS:
+                self._paused_until = max(self._paused_until, now + seconds)
+                self._recent_429.clear()
+
+    def _prune(self, now: float):
+        """Удаляет полные бакеты — они ничем не отличаются от новых."""
+        idle = [key for key, bucket in self._chats.items() if bucket.is_idle(now)]
+        for key in idle:
+            del self._chats[key]
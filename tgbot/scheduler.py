@@ -8,9 +8,8 @@ from zoneinfo import ZoneInfo
 from loguru import logger
 from django_redis import get_redis_connection
 
-from tgbot import dispatcher
 from tgbot.models import DailySubscription
-from tgbot.logics.messages import SendMessages
+from tgbot.outbox import enqueue_many
 from tgbot.logics.constants import Constants
 
 # Event для кооперативной остановки
@@ -56,8 +55,12 @@ def run_scheduler(stop_event: threading.Event):
 
                 logger.debug(f"Scheduler: проверка подписок на {current_date} в {current_time}")
                 subs = DailySubscription.objects.filter(send_time=current_time)
-                for sub in subs.iterator():
-                    SendMessages.IntFacts.today(sub.user, True)
+                # отправку делает OutboxRelay; ключ на пользователя и день защищает
+                # от повторной постановки, если планировщик перезапустился в ту же минуту
+                enqueue_many(
+                    ("int_fact_today", f"int_fact:{user_id}:{current_date.isoformat()}", {"user_id": user_id})
+                    for user_id in subs.values_list("user_id", flat=True).iterator()
+                )
 
                 # Попытка продлить lock
                 if not lock.extend(LOCK_TIMEOUT):
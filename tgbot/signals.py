@@ -151,4 +151,62 @@ def tgbot_token_post_save(sender, instance, created, **kwargs):
     def _deferred():
         cache.set(Constants.CONFIG_CHANGED, time.time())  
 
-    transaction.on_commit(_deferred)
\ No newline at end of file
+    transaction.on_commit(_deferred)
+
+
+@receiver(post_save, sender=TelegramUser)
+@receiver(post_delete, sender=TelegramUser)
+def telegram_user_changed(sender, instance, **kwargs):
+    """
+    Сбрасываем запись UserCache: blocked или профиль могли измениться.
+    """
+    from tgbot.user_cache import user_cache
+    user_cache.invalidate(instance.chat_id)
+
+
+@receiver(pre_save, sender=Article)
+@receiver(pre_save, sender=InterestingFact)
+def telegraph_link_pre_save(sender, instance, **kwargs):
+    """
+    Если ссылка изменилась, старый заголовок больше не подходит —
+    сбрасываем его и запоминаем, что нужно запросить новый.
+    """
+    old_link = None
+    if instance.pk:
+        old_link = sender.objects.filter(pk=instance.pk).values_list("link", flat=True).first()
+    instance._link_changed = old_link != instance.link
+    if instance._link_changed and old_link is not None:
+        instance.title = None
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_save, sender=InterestingFact)
+def telegraph_link_post_save(sender, instance, created, **kwargs):
+    if not getattr(instance, "_link_changed", created) and instance.title:
+        return
+    from tgbot.telegraph_titles import telegraph_titles
+    link = instance.link
+    transaction.on_commit(lambda: telegraph_titles.schedule(link))
+
+
+@receiver(post_save, sender=Glossary)
+@receiver(post_delete, sender=Glossary)
+@receiver(post_save, sender=ArticlesSection)
+@receiver(post_delete, sender=ArticlesSection)
+@receiver(post_save, sender=ArticlesSubsection)
+@receiver(post_delete, sender=ArticlesSubsection)
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+@receiver(post_save, sender=QuizTopic)
+@receiver(post_delete, sender=QuizTopic)
+@receiver(post_save, sender=QuizLevel)
+@receiver(post_delete, sender=QuizLevel)
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def content_changed(sender, instance, **kwargs):
+    """
+    Контент, из которого строятся меню, изменился — увеличиваем версию,
+    и кэш клавиатур (tgbot/keyboard_cache.py) перестраивает их при следующем показе.
+    """
+    from tgbot import content_version
+    transaction.on_commit(content_version.bump)
@@ -1,45 +1,206 @@
-from tgbot.logics.constants import Messages
-from tgbot.models import TelegramUser
+from tgbot.logics.constants import Constants, Messages
+from tgbot.logics.callback_codec import parse_callback
+from tgbot.blocked_chats import blocked_chats
+from tgbot.conversation import ConversationState
+from tgbot.outbound import Lane, OutboundCall, OutboundPool
+from tgbot.outbound_redis import RedisOutbound, RedisRateLimiter, bot_id_from_token
+from tgbot.rate_limiter import CallKind, RateLimiter
 from typing import List
 from telebot import TeleBot
 from telebot.types import Update
 from telebot.apihelper import ApiException
 
 from loguru import logger
-import time
-import threading
-import queue
 import concurrent.futures
+import contextlib
+import contextvars
+
+# класс приоритета, назначенный вызовам текущего потока через SyncBot.bulk_lane()
+_lane_override: contextvars.ContextVar[int | None] = contextvars.ContextVar("outbound_lane", default=None)
 
 class SyncBot(TeleBot):
-    def __init__(self, *args, **kwargs):
+    # правки, которые очередь может схлопывать: имя обёртки -> область правки
+    _COALESCED_EDITS = {
+        "_do_edit_message_text": OutboundCall.EDIT_TEXT,
+        "_do_edit_message_reply_markup": OutboundCall.EDIT_MARKUP,
+    }
+
+    def __init__(self, *args, outbound_workers: int | None = None, **kwargs):
         super().__init__(*args, **kwargs)
 
-        # очередь задач: каждый элемент — (func, args, kwargs, future)
-        self._call_queue: queue.Queue = queue.Queue()
-        # поток-демон, который обрабатывает очередь
-        self._worker = threading.Thread(target=self._process_queue, daemon=True)
-        self._worker.start()
+        distributed = Constants.OUTBOUND_DISTRIBUTED
+        bot_id = bot_id_from_token(self.token)
 
-    def _process_queue(self):
-        while True:
-            func, args, kwargs, future = self._call_queue.get()
-            try:
-                result = func(*args, **kwargs)
-                future.set_result(result)
-            except Exception as e:
-                future.set_exception(e)
-            # задержка между запросами
-            time.sleep(0.05)
+        # лимитер Bot API: общий бюджет, бюджет на чат и отдельный — на правки/удаления;
+        # в распределённом режиме бюджет общий для всего кластера
+        self._rate_limiter = RedisRateLimiter(bot_id) if distributed else RateLimiter()
+        # пул отправителей: вызовы одного чата — в одной очереди, разные чаты — параллельно
+        self._outbound = OutboundPool(
+            self._rate_limiter,
+            outbound_workers or Constants.OUTBOUND_WORKERS
+        )
+        # распределённый режим: вызовы идут через Redis stream, выполнить их может любой воркер
+        self._cluster = RedisOutbound(self, self._outbound, bot_id) if distributed else None
+        # маршруты callback: имя (CallbackData.*) -> handler, см. callback_route
+        self._callback_routes: dict = {}
+        self.register_callback_query_handler(self._dispatch_callback, func=self._match_callback)
+        # шаги ввода текста: ожидаемый шаг чата хранится в Redis, см. step_handler
+        self._conversation = ConversationState(bot_id)
+        self._step_handlers: dict = {}
+
+    def stop_outbound(self):
+        """
+        Останавливает отправку исходящих вызовов этого экземпляра (reload_bots):
+        уже принятые вызовы выполняются, потоки очередей и stream завершаются.
+        """
+        if self._cluster is not None:
+            self._cluster.close()
+        self._outbound.stop()
+
+    @property
+    def outbound_workers(self) -> int:
+        """Количество потоков-отправителей исходящих вызовов."""
+        return self._outbound.size
+
+    def outbound_stats(self) -> dict:
+        """Время ожидания и схлопнутые правки по классам приоритета (см. LaneStats.snapshot)."""
+        return self._outbound.stats.snapshot()
+
+    def dead_letters(self) -> list[dict]:
+        """Вызовы, которые не удалось выполнить после всех повторов."""
+        return self._outbound.dead_letters.items()
+
+    @property
+    def callback_names(self) -> frozenset[str] | None:
+        """Имена callback, для которых есть маршрут; None — маршрутов нет, принимаем любые."""
+        return frozenset(self._callback_routes) if self._callback_routes else None
+
+    def accepts_callback(self, data: str) -> bool:
+        """Есть ли handler для callback с такими data (см. CallbackCodec)."""
+        return not self._callback_routes or parse_callback(data).name in self._callback_routes
+
+    def callback_route(self, name: str):
+        """
+        Декоратор: регистрирует handler для callback с именем name (CallbackData.*).
+        Вместо перебора предикатов telebot имя разбирается один раз
+        и handler находится по словарю. Повторная регистрация заменяет handler.
+        """
+        def decorator(handler):
+            self._callback_routes[name] = handler
+            return handler
+        return decorator
+
+    def _match_callback(self, call) -> bool:
+        # имя сохраняется в call — get_callback_name_from_call его не пересчитывает
+        call.callback_name = parse_callback(call.data).name
+        return call.callback_name in self._callback_routes
+
+    def _dispatch_callback(self, call):
+        self._callback_routes[call.callback_name](call)
+
+    def step_handler(self, name: str):
+        """
+        Декоратор: регистрирует шаг ввода name (Steps.*) — handler(message, user, **data).
+        Шаг включается через set_step и обрабатывает следующее текстовое
+        сообщение чата в любом воркере; чтобы повторить ввод, handler снова вызывает set_step.
+        """
+        def decorator(handler):
+            self._step_handlers[name] = handler
+            return handler
+        return decorator
+
+    def set_step(self, chat_id: int, name: str, **data):
+        """Следующее сообщение чата обработает шаг name; data должны сериализоваться в JSON."""
+        self._conversation.set(chat_id, name, **data)
+
+    def clear_step(self, chat_id: int):
+        self._conversation.clear(chat_id)
+
+    def _run_step(self, update: Update, user) -> bool:
+        """
+        Передаёт сообщение ожидающему шагу ввода. True — сообщение обработано шагом.
+        Команда (/start и т.п.) отменяет шаг и обрабатывается как обычно.
+        """
+        message = update.message
+        state = self._conversation.take(message.chat.id)
+        if state is None:
+            return False
+        name, data = state
+        handler = self._step_handlers.get(name)
+        if handler is None:
+            logger.warning(f"Шаг {name} не зарегистрирован, сообщение {message.message_id} обработано как обычно")
+            return False
+        if (message.text or "").startswith("/"):
+            return False
+        try:
+            handler(message, user, **data)
+        except Exception as e:
+            logger.exception(f"Ошибка шага {name} для update {update.update_id}: {e}")
+        self._eat_update(update)
+        return True
+
+    @staticmethod
+    @contextlib.contextmanager
+    def bulk_lane():
+        """
+        Все вызовы, поставленные в очередь внутри блока, идут классом BULK:
+        with bot.bulk_lane():
+            for user in users: bot.send_message(...)
+        """
+        token = _lane_override.set(Lane.BULK)
+        try:
+            yield
+        finally:
+            _lane_override.reset(token)
+
+    def _submit(self, kind: str, func, target, args, kwargs, on_done=None) -> concurrent.futures.Future:
+        """
+        Помещает вызов func(target, *args, **kwargs) в очередь и сразу возвращает Future.
+
+        target — chat_id (для ответов на callback — callback_query_id),
+        по нему вызовы упорядочиваются и лимитируются.
+        on_done — необязательный колбэк fn(future), вызывается по завершении.
+        """
+        if kind == CallKind.ANSWER:
+            chat_id, lane = None, Lane.CALLBACK
+        else:
+            chat_id, lane = target, _lane_override.get()
+            if lane is None:
+                lane = Lane.INTERACTIVE
+        edit = None
+        scope = self._COALESCED_EDITS.get(getattr(func, "__name__", None))
+        if scope is not None and args:
+            edit = (scope, args[0])
+        call = OutboundCall(func, (target, *args), kwargs, target, chat_id, kind, lane, edit)
+        if on_done is not None:
+            call.future.add_done_callback(on_done)
+        if self._cluster is not None:
+            return self._cluster.submit(call)
+        self._outbound.put(call)
+        return call.future
+
+    def _enqueue(self, kind: str, func, target, *args, **kwargs):
+        """
+        Помещает вызов в очередь и возвращает его результат, блокируясь до выполнения.
+        """
+        return self._submit(kind, func, target, args, kwargs).result()
 
-    def _enqueue(self, func, *args, **kwargs):
+    def _enqueue_async(self, kind: str, func, target, args, kwargs, on_done=None) -> concurrent.futures.Future:
         """
-        Помещает вызов func(*args, **kwargs) в очередь и
-        возвращает его результат, блокируясь до выполнения.
+        Неблокирующий вариант _enqueue: возвращает Future, ошибку которого
+        дополнительно пишем в лог — её может никто не прочитать.
         """
-        future = concurrent.futures.Future()
-        self._call_queue.put((func, args, kwargs, future))
-        return future.result()
+        future = self._submit(kind, func, target, args, kwargs)
+        future.add_done_callback(self._log_async_failure)
+        if on_done is not None:
+            future.add_done_callback(on_done)
+        return future
+
+    @staticmethod
+    def _log_async_failure(future: concurrent.futures.Future):
+        exc = future.exception()
+        if exc is not None:
+            logger.error(f"Асинхронный вызов Bot API завершился ошибкой: {exc}")
 
     # --- обёртки реальных вызовов ---
     def _do_send_message(self, chat_id, *args, **kwargs):
@@ -49,25 +210,12 @@ class SyncBot(TeleBot):
             err = str(e).lower()
             # если бот заблокирован — отмечаем в пользователе
             if e.error_code == 403 and "bot was blocked by the user" in err:
-                try:
-                    u = TelegramUser.objects.get(chat_id=chat_id)
-                    u.bot_was_blocked = True
-                    u.save(update_fields=['bot_was_blocked'])
-                    logger.info(f"User {chat_id} blocked bot, flag set")
-                except TelegramUser.DoesNotExist:
-                    logger.warning(f"No TelegramUser with chat_id={chat_id}")
+                blocked_chats.mark_blocked(chat_id)
                 return None
             raise
         else:
             # при успешной отправке — сбрасываем признак блокировки
-            try:
-                u = TelegramUser.objects.get(chat_id=chat_id)
-                if u.bot_was_blocked:
-                    u.bot_was_blocked = False
-                    u.save(update_fields=['bot_was_blocked'])
-                    logger.info(f"User {chat_id} unblocked bot, flag cleared")
-            except TelegramUser.DoesNotExist:
-                pass
+            blocked_chats.mark_unblocked(chat_id)
             return msg
 
     def _do_edit_message_text(self, chat_id, message_id, text, parse_mode=None, reply_markup=None, **kwargs):
@@ -146,6 +294,8 @@ class SyncBot(TeleBot):
 
             # 4) Проверяем, не заблокирован ли пользователь
             user, _ = data
+            # handlers берут пользователя отсюда, а не повторным запросом в БД
+            message_or_callback.astro_user = user
             try:
                 if self._handle_blocked_user(update, user):
                     # внутри _handle_blocked_user уже съедает апдейт
@@ -155,10 +305,14 @@ class SyncBot(TeleBot):
                 self._eat_update(update)
                 continue
 
-            # 5) Всё успешно — добавляем к обработке
+            # 5) Сообщение, которого ждёт шаг ввода, обрабатывается шагом
+            if update.message is not None and self._step_handlers and self._run_step(update, user):
+                continue
+
+            # 6) Всё успешно — добавляем к обработке
             to_handle.append(update)
 
-        # 6) Передаём оставшиеся апдейты в TeleBot
+        # 7) Передаём оставшиеся апдейты в TeleBot
         if to_handle:
             try:
                 super().process_new_updates(to_handle)
@@ -173,13 +327,13 @@ class SyncBot(TeleBot):
         msg = Messages.GROUP_BLOCKED if is_group_chat(update.message or update.callback_query) else Messages.USER_BLOCKED
         try:
             if update.message:
-                self.send_message(
-                    chat_id=update.message.chat.id,
+                self.send_message_async(
+                    update.message.chat.id,
                     text=msg,
                     reply_to_message_id=update.message.message_id
                 )
             else:
-                self.answer_callback_query(update.callback_query.id, msg)
+                self.answer_callback_query_async(update.callback_query.id, msg)
 
             # «Съедаем» update прямо здесь
             self._eat_update(update)
@@ -214,74 +368,156 @@ class SyncBot(TeleBot):
             raise
 
     def _do_send_media_group(self, chat_id, media, *args, **kwargs):
+        return self._send_tracking_blocked(super().send_media_group, chat_id, media, *args, **kwargs)
+
+    def _do_send_photo(self, chat_id, *args, **kwargs):
+        return self._send_tracking_blocked(super().send_photo, chat_id, *args, **kwargs)
+
+    def _do_send_video(self, chat_id, *args, **kwargs):
+        return self._send_tracking_blocked(super().send_video, chat_id, *args, **kwargs)
+
+    def _do_send_document(self, chat_id, *args, **kwargs):
+        return self._send_tracking_blocked(super().send_document, chat_id, *args, **kwargs)
+
+    @staticmethod
+    def _send_tracking_blocked(send, chat_id, *args, **kwargs):
+        """
+        Выполняет send(chat_id, ...) и обновляет признак блокировки бота
+        в BlockedChats (без обращения к БД — запись идёт пачками).
+        """
         try:
-            msgs = super().send_media_group(chat_id, media, *args, **kwargs)
+            result = send(chat_id, *args, **kwargs)
         except ApiException as e:
-            err = str(e).lower()
-            if e.error_code == 403 and "bot was blocked by the user" in err:
-                TelegramUser.objects.filter(chat_id=chat_id).update(bot_was_blocked=True)
+            if e.error_code == 403 and "bot was blocked by the user" in str(e).lower():
+                blocked_chats.mark_blocked(chat_id)
                 return None
             raise
-        else:
-            TelegramUser.objects.filter(chat_id=chat_id, bot_was_blocked=True).update(bot_was_blocked=False)
-            return msgs
+        blocked_chats.mark_unblocked(chat_id)
+        return result
 
-    def _do_send_photo(self, chat_id, *args, **kwargs):
+    def _do_edit_message_media(self, chat_id, message_id, media, **kwargs):
         try:
-            return super().send_photo(chat_id, *args, **kwargs)
+            return super().edit_message_media(
+                media,
+                chat_id=chat_id,
+                message_id=message_id,
+                **kwargs
+            )
         except ApiException as e:
-            if e.error_code == 403 and "bot was blocked by the user" in str(e).lower():
-                TelegramUser.objects.filter(chat_id=chat_id).update(bot_was_blocked=True)
+            err = str(e).lower()
+            if "message is not modified" in err:
                 return None
+            logger.error(f"Failed to edit_message_media {message_id}: {e}")
             raise
 
-    def _do_send_video(self, chat_id, *args, **kwargs):
+    def _do_edit_message_caption(self, chat_id, message_id, caption, **kwargs):
         try:
-            return super().send_video(chat_id, *args, **kwargs)
+            return super().edit_message_caption(
+                caption,
+                chat_id=chat_id,
+                message_id=message_id,
+                **kwargs
+            )
         except ApiException as e:
-            if e.error_code == 403 and "bot was blocked by the user" in str(e).lower():
-                TelegramUser.objects.filter(chat_id=chat_id).update(bot_was_blocked=True)
+            err = str(e).lower()
+            if "message is not modified" in err:
                 return None
+            logger.error(f"Failed to edit_message_caption {message_id}: {e}")
             raise
 
-    def _do_send_document(self, chat_id, *args, **kwargs):
+    def _do_delete_messages(self, chat_id, message_ids):
         try:
-            return super().send_document(chat_id, *args, **kwargs)
+            return super().delete_messages(chat_id, message_ids)
         except ApiException as e:
-            if e.error_code == 403 and "bot was blocked by the user" in str(e).lower():
-                TelegramUser.objects.filter(chat_id=chat_id).update(bot_was_blocked=True)
+            err = str(e).lower()
+            if "message to delete not found" in err or "message can't be deleted" in err:
                 return None
+            logger.error(f"Не удалось delete_messages {message_ids}: {e}")
             raise
 
     def send_message(self, chat_id, *args, **kwargs):
-        return self._enqueue(self._do_send_message, chat_id, *args, **kwargs)
+        return self._enqueue(CallKind.SEND, self._do_send_message, chat_id, *args, **kwargs)
     
     def send_media_group(self, chat_id, media, *args, **kwargs):
-        return self._enqueue(self._do_send_media_group, chat_id, media, *args, **kwargs)
+        return self._enqueue(CallKind.SEND, self._do_send_media_group, chat_id, media, *args, **kwargs)
 
     def send_photo(self, chat_id, *args, **kwargs):
-        return self._enqueue(self._do_send_photo, chat_id, *args, **kwargs)
+        return self._enqueue(CallKind.SEND, self._do_send_photo, chat_id, *args, **kwargs)
 
     def send_video(self, chat_id, *args, **kwargs):
-        return self._enqueue(self._do_send_video, chat_id, *args, **kwargs)
+        return self._enqueue(CallKind.SEND, self._do_send_video, chat_id, *args, **kwargs)
 
     def send_document(self, chat_id, *args, **kwargs):
-        return self._enqueue(self._do_send_document, chat_id, *args, **kwargs)
+        return self._enqueue(CallKind.SEND, self._do_send_document, chat_id, *args, **kwargs)
 
     def edit_message_text(self, chat_id, message_id, text, parse_mode=None, reply_markup=None, **kwargs):
         return self._enqueue(
-            self._do_edit_message_text,
+            CallKind.EDIT, self._do_edit_message_text,
             chat_id, message_id, text, parse_mode, reply_markup, **kwargs
         )
 
     def edit_message_reply_markup(self, chat_id, message_id, reply_markup, **kwargs):
         return self._enqueue(
-            self._do_edit_message_reply_markup,
+            CallKind.EDIT, self._do_edit_message_reply_markup,
             chat_id, message_id, reply_markup, **kwargs
         )
 
+    def edit_message_media(self, media, chat_id=None, message_id=None, **kwargs):
+        return self._enqueue(
+            CallKind.EDIT, self._do_edit_message_media,
+            chat_id, message_id, media, **kwargs
+        )
+
+    def edit_message_caption(self, caption, chat_id=None, message_id=None, **kwargs):
+        return self._enqueue(
+            CallKind.EDIT, self._do_edit_message_caption,
+            chat_id, message_id, caption, **kwargs
+        )
+
     def answer_callback_query(self, callback_query_id, *args, **kwargs):
-        return self._enqueue(self._do_answer_callback_query, callback_query_id, *args, **kwargs)
+        return self._enqueue(CallKind.ANSWER, self._do_answer_callback_query, callback_query_id, *args, **kwargs)
     
     def delete_message(self, chat_id, message_id):
-        return self._enqueue(self._do_delete_message, chat_id, message_id)
\ No newline at end of file
+        return self._enqueue(CallKind.EDIT, self._do_delete_message, chat_id, message_id)
+
+    def delete_messages(self, chat_id, message_ids):
+        return self._enqueue(CallKind.EDIT, self._do_delete_messages, chat_id, message_ids)
+
+    # --- неблокирующие варианты: возвращают concurrent.futures.Future ---
+    # on_done(future) вызывается в потоке-отправителе, поэтому должен быть быстрым.
+    # Из async-кода Future можно дождаться через asyncio.wrap_future(future).
+    def send_message_async(self, chat_id, *args, on_done=None, **kwargs):
+        return self._enqueue_async(CallKind.SEND, self._do_send_message, chat_id, args, kwargs, on_done)
+
+    def send_media_group_async(self, chat_id, media, *args, on_done=None, **kwargs):
+        return self._enqueue_async(CallKind.SEND, self._do_send_media_group, chat_id, (media, *args), kwargs, on_done)
+
+    def send_photo_async(self, chat_id, *args, on_done=None, **kwargs):
+        return self._enqueue_async(CallKind.SEND, self._do_send_photo, chat_id, args, kwargs, on_done)
+
+    def send_video_async(self, chat_id, *args, on_done=None, **kwargs):
+        return self._enqueue_async(CallKind.SEND, self._do_send_video, chat_id, args, kwargs, on_done)
+
+    def send_document_async(self, chat_id, *args, on_done=None, **kwargs):
+        return self._enqueue_async(CallKind.SEND, self._do_send_document, chat_id, args, kwargs, on_done)
+
+    def edit_message_text_async(self, chat_id, message_id, text, parse_mode=None, reply_markup=None, on_done=None, **kwargs):
+        return self._enqueue_async(
+            CallKind.EDIT, self._do_edit_message_text,
+            chat_id, (message_id, text, parse_mode, reply_markup), kwargs, on_done
+        )
+
+    def edit_message_reply_markup_async(self, chat_id, message_id, reply_markup, on_done=None, **kwargs):
+        return self._enqueue_async(
+            CallKind.EDIT, self._do_edit_message_reply_markup,
+            chat_id, (message_id, reply_markup), kwargs, on_done
+        )
+
+    def answer_callback_query_async(self, callback_query_id, *args, on_done=None, **kwargs):
+        return self._enqueue_async(CallKind.ANSWER, self._do_answer_callback_query, callback_query_id, args, kwargs, on_done)
+
+    def delete_message_async(self, chat_id, message_id, on_done=None):
+        return self._enqueue_async(CallKind.EDIT, self._do_delete_message, chat_id, (message_id,), {}, on_done)
+
+    def delete_messages_async(self, chat_id, message_ids, on_done=None):
+        return self._enqueue_async(CallKind.EDIT, self._do_delete_messages, chat_id, (message_ids,), {}, on_done)
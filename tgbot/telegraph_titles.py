@@ -0,0 +1,165 @@
+import queue
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils import timezone
+
+from tgbot import content_version
+from tgbot.models import Article, InterestingFact, TelegraphPage
+from tgbot.logics.constants import Constants
+from tgbot.logics.telegraph_helper import TelegraphClient, telegraph_path
+
+from pathlib import Path
+from loguru import logger
+
+Path("logs").mkdir(parents=True, exist_ok=True)
+
+log_filename = Path("logs") / f"{Path(__file__).stem}.log"
+logger.add(str(log_filename), rotation="10 MB", level="INFO")
+
+
+# модели со ссылкой на telegra.ph и сохранённым заголовком
+TITLED_MODELS = (Article, InterestingFact)
+
+_PAGE_FIELDS = ["title", "author_name", "views", "content_hash", "etag", "last_modified", "fetched_at"]
+
+
+class TelegraphTitles:
+    """
+    Фоновое заполнение поля title у Article и InterestingFact.
+
+    Клавиатуры и админка читают сохранённый заголовок и не ходят в сеть.
+    Ссылки ставятся в очередь, когда их сохраняют (signals), а раз в
+    TELEGRAPH_TITLE_REFRESH_INTERVAL — все сразу; полное обновление
+    выполняет один воркер (флаг в кэше).
+
+    Очередь разбирается пачками до TELEGRAPH_FETCH_BATCH ссылок: страницы
+    запрашиваются параллельно через TelegraphClient с условными запросами
+    по ETag/Last-Modified из TelegraphPage, метаданные сохраняются
+    в TelegraphPage, заголовок копируется во все записи с этой ссылкой.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._queue: queue.Queue = queue.Queue()
+        self._client = TelegraphClient()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="TelegraphTitles")
+            self._thread.start()
+            logger.info("TelegraphTitles: запущен")
+
+    def stop(self):
+        self._stop.set()
+
+    def schedule(self, link: str):
+        """Запросить заголовок страницы по ссылке в фоне."""
+        self._queue.put(link)
+
+    def refresh_all(self):
+        links = set()
+        for model in TITLED_MODELS:
+            links.update(model.objects.values_list("link", flat=True))
+        for link in links:
+            self.schedule(link)
+
+    def _next_batch(self) -> set[str]:
+        try:
+            batch = {self._queue.get(timeout=1)}
+        except queue.Empty:
+            return set()
+        while len(batch) < Constants.TELEGRAPH_FETCH_BATCH:
+            try:
+                batch.add(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        next_refresh = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() >= next_refresh:
+                    next_refresh = time.monotonic() + Constants.TELEGRAPH_TITLE_REFRESH_INTERVAL
+                    close_old_connections()
+                    if cache.add(Constants.TELEGRAPH_TITLE_REFRESH_FLAG, True,
+                                 timeout=Constants.TELEGRAPH_TITLE_REFRESH_INTERVAL):
+                        self.refresh_all()
+                batch = self._next_batch()
+                if batch:
+                    close_old_connections()
+                    self.sync(batch)
+            except Exception as e:
+                logger.exception(f"TelegraphTitles: ошибка цикла: {e}")
+                self._stop.wait(1)
+
+    def sync(self, links) -> int:
+        """
+        Обновляет TelegraphPage и заголовки записей для ссылок links.
+        Возвращает число страниц, по которым получен ответ.
+        """
+        links_by_path: dict[str, list[str]] = {}
+        for link in links:
+            path = telegraph_path(link)
+            if path is None:
+                logger.warning(f"TelegraphTitles: не ссылка на telegra.ph: {link}")
+                continue
+            links_by_path.setdefault(path, []).append(link)
+        if not links_by_path:
+            return 0
+
+        pages = {page.path: page for page in TelegraphPage.objects.filter(path__in=links_by_path)}
+        fetched = self._client.fetch_many(
+            (path, pages[path].etag, pages[path].last_modified) if path in pages else (path, None, None)
+            for path in links_by_path
+        )
+
+        now = timezone.now()
+        new_pages, changed_pages = [], []
+        for path, meta in fetched.items():
+            page = pages.get(path)
+            if page is None:
+                page = TelegraphPage(path=path)
+                new_pages.append(page)
+            else:
+                changed_pages.append(page)
+            page.fetched_at = now
+            if not meta.not_modified:
+                page.title = meta.title and meta.title[:256]
+                page.author_name = meta.author_name and meta.author_name[:128]
+                page.views = meta.views
+                page.content_hash = meta.content_hash
+                page.etag = meta.etag
+                page.last_modified = meta.last_modified
+            pages[path] = page
+
+        TelegraphPage.objects.bulk_create(new_pages, batch_size=500, ignore_conflicts=True)
+        TelegraphPage.objects.bulk_update(changed_pages, _PAGE_FIELDS, batch_size=500)
+
+        updated = 0
+        for path in fetched:
+            title = pages[path].title
+            if not title:
+                continue
+            for model in TITLED_MODELS:
+                updated += model.objects.filter(link__in=links_by_path[path]).exclude(title=title).update(title=title)
+        # update() не вызывает signals, а заголовки статей есть в кэшированных клавиатурах
+        if updated:
+            content_version.bump()
+
+        logger.info(
+            f"TelegraphTitles: проверено {len(fetched)} из {len(links_by_path)} страниц, "
+            f"не изменились {sum(meta.not_modified for meta in fetched.values())}"
+        )
+        return len(fetched)
+
+
+telegraph_titles = TelegraphTitles()
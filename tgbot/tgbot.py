@@ -14,6 +14,8 @@ from django.core.cache import cache
 from tgbot import dispatcher
 from tgbot.bot_instances import bots
 from tgbot.scheduler import run_scheduler, sheduler_stop_event
+from tgbot.outbox import outbox_relay
+from tgbot.telegraph_titles import telegraph_titles
 from tgbot.logics.constants import Constants, Messages
 
 from aioredlock import Aioredlock, LockError
@@ -89,6 +91,18 @@ async def _setup_webhook(bot, lock_key, url, description):
             logger.exception(f"(PID {os.getpid()}) Failed to release lock for {description}")
 
 
+def _register_bot(index: int, bot):
+    """
+    Публикует бота для webhook-view; экземпляр, который он заменил
+    (reload_bots), останавливает свои очереди исходящих вызовов.
+    """
+    old = bots.get(index)
+    bots[index] = bot
+    if old is not None and old is not bot:
+        old.stop_outbound()
+        logger.info(f"(PID {os.getpid()}) Outbound of replaced bot {index} stopped")
+
+
 def _main_bot_worker():
     """
     Synchronous wrapper to get main bot and setup webhook.
@@ -104,7 +118,7 @@ def _main_bot_worker():
         'tgbot.handlers.quzzes',
     ):
         importlib.reload(importlib.import_module(module_name))
-    bots[Constants.MAIN_BOT_WH_I] = bot
+    _register_bot(Constants.MAIN_BOT_WH_I, bot)
     url = Constants.BOT_WEBHOOCK_URL.format(i=Constants.MAIN_BOT_WH_I)
     asyncio.run(_setup_webhook(bot, MAIN_BOT_LOCK, url, "main bot"))
 
@@ -126,9 +140,9 @@ def _test_bot_worker():
     def _c(c):
         from tgbot.user_helper import is_group_chat
         if is_group_chat(c.message): return
-        test_bot.answer_callback_query(c.id, text=Messages.IN_TEST_MODE_MESSAGE)
+        test_bot.answer_callback_query_async(c.id, text=Messages.IN_TEST_MODE_MESSAGE)
         test_bot.send_message(c.message.chat.id, Messages.IN_TEST_MODE_MESSAGE, parse_mode="Markdown")
-    bots[Constants.TEST_BOT_WH_I] = test_bot
+    _register_bot(Constants.TEST_BOT_WH_I, test_bot)
     url = Constants.BOT_WEBHOOCK_URL.format(i=Constants.TEST_BOT_WH_I)
     asyncio.run(_setup_webhook(test_bot, TEST_BOT_LOCK, url, "test bot"))
 
@@ -209,5 +223,8 @@ def start():
     _clear_cache_once()
     _start_bots()
     _run_sheduler()
+    # outbox не зависит от экземпляра бота и переживает reload_bots()
+    outbox_relay.start()
+    telegraph_titles.start()
     threading.Thread(target=_watch_config_changes, daemon=True).start()
     logger.info(f"Config watcher started (PID {os.getpid()})")
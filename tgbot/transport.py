@@ -0,0 +1,175 @@
+import threading
+import urllib.parse
+
+import requests
+from requests.adapters import HTTPAdapter
+from telebot import apihelper
+
+from tgbot.logics.constants import Constants
+
+from pathlib import Path
+from loguru import logger
+
+Path("logs").mkdir(parents=True, exist_ok=True)
+
+log_filename = Path("logs") / f"{Path(__file__).stem}.log"
+logger.add(str(log_filename), rotation="10 MB", level="INFO")
+
+# Методы, которые загружают файлы: для них отдельные (длинные) таймауты
+MEDIA_METHODS = frozenset({
+    "sendPhoto",
+    "sendVideo",
+    "sendDocument",
+    "sendAudio",
+    "sendAnimation",
+    "sendVoice",
+    "sendMediaGroup",
+    "editMessageMedia",
+})
+
+
+def _timeouts_for(url: str, files, timeout=None) -> tuple[float, float]:
+    """
+    (connect, read) таймауты вызова. telebot всегда передаёт timeout: если он
+    отличается от умолчаний apihelper, его задал вызывающий (send_*(timeout=...),
+    long polling) и он используется как есть; иначе таймауты выбираются
+    по типу вызова — загрузка медиа или обычный текстовый вызов.
+    """
+    if timeout is not None:
+        if not isinstance(timeout, tuple):
+            timeout = (timeout, timeout)
+        if timeout != (apihelper.CONNECT_TIMEOUT, apihelper.READ_TIMEOUT):
+            return timeout
+    method_name = url.rsplit("/", 1)[-1]
+    if files or method_name in MEDIA_METHODS:
+        return Constants.TG_MEDIA_CONNECT_TIMEOUT, Constants.TG_MEDIA_READ_TIMEOUT
+    return Constants.TG_CONNECT_TIMEOUT, Constants.TG_READ_TIMEOUT
+
+
+class RequestsTransport:
+    """
+    Транспорт на requests: одна сессия с пулом keep-alive соединений,
+    общая для всех потоков-отправителей. Повторы делает очередь исходящих
+    вызовов (tgbot/outbound.py), поэтому у адаптера они отключены.
+    """
+
+    def __init__(self, pool_size: int):
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+    def __call__(self, method, url, params=None, files=None, timeout=None, proxies=None):
+        return self._session.request(
+            method, url, params=params, files=files,
+            timeout=_timeouts_for(url, files, timeout), proxies=proxies
+        )
+
+
+class _HttpxResponse:
+    """
+    Приводит ответ httpx к интерфейсу requests.Response, который ожидает telebot.apihelper.
+    """
+    __slots__ = ("_response",)
+
+    def __init__(self, response):
+        self._response = response
+
+    @property
+    def status_code(self):
+        return self._response.status_code
+
+    @property
+    def reason(self):
+        return self._response.reason_phrase
+
+    @property
+    def text(self):
+        return self._response.text
+
+    def json(self):
+        return self._response.json()
+
+
+class HttpxTransport:
+    """
+    Транспорт на httpx с HTTP/2: все вызовы мультиплексируются
+    в небольшом числе соединений. Требует пакет httpx[http2].
+
+    httpx задаёт прокси на клиента, а не на запрос, поэтому на каждый
+    прокси из apihelper.proxy создаётся свой клиент.
+    """
+
+    def __init__(self, pool_size: int):
+        import httpx
+
+        self._httpx = httpx
+        self._pool_size = pool_size
+        self._lock = threading.Lock()
+        # URL прокси (None — без прокси) -> httpx.Client
+        self._clients: dict = {}
+
+    def _client_for(self, url: str, proxies):
+        proxy = None
+        if proxies:
+            proxy = proxies.get(urllib.parse.urlsplit(url).scheme) or proxies.get("all")
+        client = self._clients.get(proxy)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(proxy)
+                if client is None:
+                    httpx = self._httpx
+                    client = httpx.Client(
+                        http2=True,
+                        proxy=proxy,
+                        limits=httpx.Limits(
+                            max_connections=self._pool_size, max_keepalive_connections=self._pool_size
+                        ),
+                    )
+                    self._clients[proxy] = client
+        return client
+
+    def __call__(self, method, url, params=None, files=None, timeout=None, proxies=None):
+        connect, read = _timeouts_for(url, files, timeout)
+        httpx = self._httpx
+        # ошибки сети приводим к исключениям requests: их распознают повторы
+        # очереди исходящих вызовов (OutboundQueue._is_transient) и telebot
+        try:
+            response = self._client_for(url, proxies).request(
+                method.upper(), url, params=params, files=files,
+                timeout=httpx.Timeout(read, connect=connect)
+            )
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+        return _HttpxResponse(response)
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def install_transport(pool_size: int):
+    """
+    Подключает транспорт к telebot.apihelper (один на процесс, общий для всех ботов).
+    Бэкенд выбирается Constants.TG_HTTP_BACKEND: "requests" или "http2".
+    """
+    global _transport
+    with _transport_lock:
+        if _transport is not None:
+            return _transport
+
+        if Constants.TG_HTTP_BACKEND == "http2":
+            try:
+                _transport = HttpxTransport(pool_size)
+                logger.info(f"install_transport: HTTP/2 (httpx), pool_size={pool_size}")
+            except ImportError:
+                logger.warning("install_transport: httpx не установлен — используем requests")
+
+        if _transport is None:
+            _transport = RequestsTransport(pool_size)
+            logger.info(f"install_transport: requests, pool_size={pool_size}")
+
+        apihelper.CUSTOM_REQUEST_SENDER = _transport
+        return _transport
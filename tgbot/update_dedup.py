@@ -0,0 +1,72 @@
+import threading
+
+from cachetools import LRUCache
+from django_redis import get_redis_connection
+
+from tgbot.logics.constants import Constants
+
+from pathlib import Path
+from loguru import logger
+
+Path("logs").mkdir(parents=True, exist_ok=True)
+
+log_filename = Path("logs") / f"{Path(__file__).stem}.log"
+logger.add(str(log_filename), rotation="10 MB", level="INFO")
+
+
+class UpdateDeduplicator:
+    """
+    Отсеивает повторные доставки апдейтов по update_id.
+
+    Telegram повторяет доставку, если вебхук ответил не сразу, и повтор может
+    прийти в другой воркер. Поэтому update_id отмечается в Redis через
+    SET NX с коротким TTL (UPDATE_DEDUP_TTL), а перед Redis стоит локальный
+    LRU — повтор, пришедший в тот же процесс, отсеивается без сетевого вызова.
+    Если Redis недоступен, работает только локальный LRU.
+    """
+
+    def __init__(self, local_size: int, ttl: int):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._local: LRUCache = LRUCache(maxsize=local_size)
+        self._dropped = 0
+
+    @property
+    def dropped(self) -> int:
+        """Сколько повторных апдейтов отброшено этим процессом."""
+        return self._dropped
+
+    def _drop(self, bot_id: str, update_id: int) -> bool:
+        with self._lock:
+            self._dropped += 1
+        logger.info(f"UpdateDeduplicator: повтор update {update_id} бота {bot_id} отброшен")
+        return True
+
+    def is_duplicate(self, bot_id: str, update_id: int) -> bool:
+        """
+        True, если апдейт уже встречался; иначе отмечает его как увиденный.
+        """
+        key = (bot_id, update_id)
+        with self._lock:
+            if key in self._local:
+                seen_locally = True
+            else:
+                seen_locally = False
+                self._local[key] = True
+        if seen_locally:
+            return self._drop(bot_id, update_id)
+
+        try:
+            redis_conn = get_redis_connection("default")
+            is_new = redis_conn.set(
+                f"{Constants.UPDATE_DEDUP_PREFIX}:{bot_id}:{update_id}", 1, nx=True, ex=self._ttl
+            )
+        except Exception as e:
+            logger.warning(f"UpdateDeduplicator: Redis недоступен, проверяем только локально: {e}")
+            return False
+        if not is_new:
+            return self._drop(bot_id, update_id)
+        return False
+
+
+update_dedup = UpdateDeduplicator(Constants.UPDATE_DEDUP_LOCAL_SIZE, Constants.UPDATE_DEDUP_TTL)
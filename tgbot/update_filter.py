@@ -0,0 +1,74 @@
+import json
+
+from pathlib import Path
+from loguru import logger
+
+try:
+    import orjson
+except ImportError:  # orjson есть в requirements.txt; без него — стандартный json
+    orjson = None
+
+Path("logs").mkdir(parents=True, exist_ok=True)
+
+log_filename = Path("logs") / f"{Path(__file__).stem}.log"
+logger.add(str(log_filename), rotation="10 MB", level="INFO")
+
+if orjson is None:
+    logger.warning("update_filter: orjson не установлен — тело webhook разбирается стандартным json")
+
+
+if orjson is not None:
+    JSONDecodeError = orjson.JSONDecodeError
+
+    def loads(body: bytes):
+        return orjson.loads(body)
+else:
+    JSONDecodeError = json.JSONDecodeError
+
+    def loads(body: bytes):
+        return json.loads(body)
+
+
+GROUP_CHAT_TYPES = ("group", "supergroup")
+
+
+def _message_of(payload: dict) -> dict | None:
+    callback = payload.get("callback_query")
+    if callback is not None:
+        return callback.get("message")
+    return payload.get("message")
+
+
+def chat_id_of(payload: dict) -> int | None:
+    """chat.id апдейта, прошедшего prefilter, — ключ очереди UpdateWorkerPool."""
+    message = _message_of(payload) or {}
+    return (message.get("chat") or {}).get("id")
+
+
+def prefilter(bot, payload: dict) -> str | None:
+    """
+    Быстрая проверка апдейта по сырому dict, до построения объектов telebot.
+    Читает только message / callback_query, chat.type и callback_query.data.
+
+    Возвращает причину, по которой апдейт можно отбросить (его всё равно
+    пропустил бы SyncBot.process_new_updates или не нашёлся бы handler),
+    либо None, если апдейт нужно обработать.
+    """
+    message = payload.get("message")
+    callback = payload.get("callback_query")
+    if callback is not None:
+        message = callback.get("message")
+        if message is None:
+            return "callback без message"
+    elif message is None:
+        return "нет message/callback"
+
+    chat = message.get("chat") or {}
+    if chat.get("id") is None:
+        return "нет chat.id"
+    if chat.get("type") in GROUP_CHAT_TYPES:
+        return "групповой чат"
+
+    if callback is not None and not bot.accepts_callback(callback.get("data") or ""):
+        return "неизвестный callback"
+    return None
@@ -0,0 +1,175 @@
+import queue
+import threading
+import time
+from collections import deque
+
+from cachetools import LRUCache
+from django.db import close_old_connections
+from telebot import types
+
+from tgbot.logics.constants import Constants
+from tgbot.outbound_redis import bot_id_from_token
+from tgbot.update_dedup import update_dedup
+from tgbot.update_filter import chat_id_of
+
+from pathlib import Path
+from loguru import logger
+
+Path("logs").mkdir(parents=True, exist_ok=True)
+
+log_filename = Path("logs") / f"{Path(__file__).stem}.log"
+logger.add(str(log_filename), rotation="10 MB", level="INFO")
+
+
+class UpdateWaitStats:
+    """
+    Время ожидания апдейтов в очереди: общее и по чатам
+    (по чатам — для последних UPDATE_STATS_CHATS активных чатов).
+    """
+
+    def __init__(self, chats: int):
+        self._lock = threading.Lock()
+        self._count = 0
+        self._total = 0.0
+        self._max = 0.0
+        # chat_id -> [count, total, max]
+        self._chats: LRUCache = LRUCache(maxsize=chats)
+
+    def record(self, chat_id: int, wait: float):
+        with self._lock:
+            self._count += 1
+            self._total += wait
+            self._max = max(self._max, wait)
+            entry = self._chats.get(chat_id)
+            if entry is None:
+                entry = self._chats[chat_id] = [0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += wait
+            entry[2] = max(entry[2], wait)
+
+    @staticmethod
+    def _summary(count: int, total: float, max_wait: float) -> dict:
+        return {"count": count, "avg_wait": total / count if count else 0.0, "max_wait": max_wait}
+
+    def chat(self, chat_id: int) -> dict | None:
+        with self._lock:
+            entry = self._chats.get(chat_id)
+            return None if entry is None else self._summary(*entry)
+
+    def snapshot(self, slowest: int = 10) -> dict:
+        """
+        {"count", "avg_wait", "max_wait", "slowest_chats": [(chat_id, max_wait), ...]}
+        """
+        with self._lock:
+            result = self._summary(self._count, self._total, self._max)
+            result["slowest_chats"] = sorted(
+                ((chat_id, entry[2]) for chat_id, entry in self._chats.items()),
+                key=lambda item: item[1], reverse=True
+            )[:slowest]
+            return result
+
+
+class UpdateWorkerPool:
+    """
+    Пул потоков, обрабатывающих входящие апдейты вебхука.
+
+    Вебхук только кладёт (bot, payload) в очередь и сразу отвечает
+    Telegram 200, а Update из payload строится и обрабатывается здесь.
+    Повторные доставки отсеиваются UpdateDeduplicator до разбора.
+
+    Апдейты разложены по чатам: внутри чата строго FIFO и не более одного
+    апдейта одновременно (два быстрых нажатия не гонятся в
+    _update_or_replace_last), а разные чаты обрабатываются параллельно
+    в UPDATE_WORKERS потоках. Если апдейтов в очереди больше UPDATE_QUEUE_SIZE,
+    submit возвращает False — вебхук отвечает ошибкой, и Telegram повторит
+    доставку позже. Потоки запускаются при первом апдейте.
+    """
+
+    def __init__(self, workers: int, maxsize: int):
+        self._workers = max(1, workers)
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._started = False
+        # chat_id -> deque[(bot, payload, enqueued_at)]; чат присутствует,
+        # пока у него есть апдейты (в том числе обрабатываемый сейчас)
+        self._pending: dict[int, deque] = {}
+        # чаты, чей следующий апдейт можно брать в работу
+        self._ready: queue.Queue = queue.Queue()
+        self._depth = 0
+        self.stats = UpdateWaitStats(Constants.UPDATE_STATS_CHATS)
+
+    @property
+    def depth(self) -> int:
+        """Сколько апдейтов ждёт обработки."""
+        return self._depth
+
+    @property
+    def active_chats(self) -> int:
+        """Сколько чатов с необработанными апдейтами."""
+        return len(self._pending)
+
+    def _ensure_started(self):
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            for i in range(self._workers):
+                threading.Thread(target=self._run, daemon=True, name=f"UpdateWorker-{i}").start()
+            self._started = True
+            logger.info(f"UpdateWorkerPool: запущено {self._workers} потоков")
+
+    def submit(self, bot, payload: dict) -> bool:
+        self._ensure_started()
+        chat_id = chat_id_of(payload)
+        with self._lock:
+            if self._depth >= self._maxsize:
+                logger.warning(f"UpdateWorkerPool: очередь заполнена, update {payload['update_id']} отклонён")
+                return False
+            self._depth += 1
+            pending = self._pending.get(chat_id)
+            if pending is None:
+                self._pending[chat_id] = deque([(bot, payload, time.monotonic())])
+                self._ready.put(chat_id)
+            else:
+                pending.append((bot, payload, time.monotonic()))
+        return True
+
+    def _run(self):
+        while True:
+            chat_id = self._ready.get()
+            with self._lock:
+                bot, payload, enqueued_at = self._pending[chat_id].popleft()
+                self._depth -= 1
+            self.stats.record(chat_id, time.monotonic() - enqueued_at)
+            try:
+                self._process(bot, payload)
+            finally:
+                with self._lock:
+                    # следующий апдейт чата берётся только после завершения текущего
+                    if self._pending[chat_id]:
+                        self._ready.put(chat_id)
+                    else:
+                        del self._pending[chat_id]
+
+    @staticmethod
+    def _process(bot, payload: dict):
+        update_id = payload["update_id"]
+        # повторная доставка того же апдейта (в т.ч. принятая другим воркером)
+        if update_dedup.is_duplicate(bot_id_from_token(bot.token), update_id):
+            return
+        try:
+            update = types.Update.de_json(payload)
+        except Exception as e:
+            logger.exception(f"UpdateWorkerPool: ошибка разбора апдейта {update_id}: {e}")
+            return
+        close_old_connections()
+        try:
+            bot.process_new_updates([update])
+        except Exception as e:
+            logger.exception(f"UpdateWorkerPool: ошибка обработки апдейта {update_id}: {e}")
+        finally:
+            close_old_connections()
+
+
+update_workers = UpdateWorkerPool(Constants.UPDATE_WORKERS, Constants.UPDATE_QUEUE_SIZE)
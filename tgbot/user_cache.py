@@ -0,0 +1,151 @@
+import hashlib
+import threading
+from collections import namedtuple
+
+from cachetools import TTLCache
+from django_redis import get_redis_connection
+
+from tgbot.models import TelegramUser
+from tgbot.logics.constants import Constants
+from tgbot.write_behind import WriteBehindBuffer
+
+from pathlib import Path
+from loguru import logger
+
+Path("logs").mkdir(parents=True, exist_ok=True)
+
+log_filename = Path("logs") / f"{Path(__file__).stem}.log"
+logger.add(str(log_filename), rotation="10 MB", level="INFO")
+
+
+# pk — TelegramUser.pk, blocked — флаг блокировки администратором,
+# fingerprint — отпечаток профиля (first_name, last_name, username)
+UserEntry = namedtuple("UserEntry", ("pk", "blocked", "fingerprint"))
+
+# поля, из которых собирается TelegramUser без запроса в БД; порядок — как в модели
+_LOADED_FIELDS = ("id", "chat_id", "first_name", "last_name", "username", "blocked")
+_PROFILE_FIELDS = ["first_name", "last_name", "username"]
+
+
+def profile_fingerprint(first_name: str, last_name: str, username: str) -> str:
+    # стабилен между процессами, в отличие от встроенного hash()
+    raw = "\x1f".join((first_name, last_name, username)).encode()
+    return hashlib.blake2b(raw, digest_size=8).hexdigest()
+
+
+class UserCache:
+    """
+    Кэш chat_id -> UserEntry для sync_user_data: локальный TTL-кэш
+    и общий для всех воркеров Redis.
+
+    Известный пользователь с неизменившимся профилем вообще не трогает БД.
+    Изменения профиля пишутся отложенно и пачкой (bulk_update).
+    Сохранение TelegramUser сбрасывает запись (signals), а локальный кэш
+    живёт не дольше USER_CACHE_LOCAL_TTL — так изменения, сделанные
+    в другом воркере (например, блокировка), доходят до всех.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local: TTLCache = TTLCache(
+            maxsize=Constants.USER_CACHE_LOCAL_SIZE, ttl=Constants.USER_CACHE_LOCAL_TTL
+        )
+        self._profiles = WriteBehindBuffer(
+            "user_profiles", self._flush_profiles, Constants.USER_PROFILE_FLUSH_INTERVAL
+        )
+
+    @staticmethod
+    def _key(chat_id: int) -> str:
+        return f"{Constants.USER_CACHE_PREFIX}:{chat_id}"
+
+    def get(self, chat_id: int) -> UserEntry | None:
+        with self._lock:
+            entry = self._local.get(chat_id)
+        if entry is not None:
+            return entry
+        try:
+            raw = get_redis_connection("default").get(self._key(chat_id))
+        except Exception as e:
+            logger.warning(f"UserCache: Redis недоступен: {e}")
+            return None
+        if raw is None:
+            return None
+        pk, blocked, fingerprint = raw.decode().split("|")
+        entry = UserEntry(int(pk), blocked == "1", fingerprint)
+        with self._lock:
+            self._local[chat_id] = entry
+        return entry
+
+    def put(self, chat_id: int, entry: UserEntry):
+        with self._lock:
+            self._local[chat_id] = entry
+        try:
+            get_redis_connection("default").set(
+                self._key(chat_id),
+                f"{entry.pk}|{int(entry.blocked)}|{entry.fingerprint}",
+                ex=Constants.USER_CACHE_TTL,
+            )
+        except Exception as e:
+            logger.warning(f"UserCache: не удалось записать chat_id={chat_id} в Redis: {e}")
+
+    def put_user(self, user: TelegramUser):
+        self.put(user.chat_id, UserEntry(
+            user.pk,
+            user.blocked,
+            profile_fingerprint(user.first_name or "", user.last_name or "", user.username or ""),
+        ))
+
+    def invalidate(self, *chat_ids: int):
+        if not chat_ids:
+            return
+        with self._lock:
+            for chat_id in chat_ids:
+                self._local.pop(chat_id, None)
+        try:
+            get_redis_connection("default").delete(*(self._key(chat_id) for chat_id in chat_ids))
+        except Exception as e:
+            logger.warning(f"UserCache: не удалось сбросить {len(chat_ids)} записей в Redis: {e}")
+
+    def update_profile(self, chat_id: int, entry: UserEntry, first_name: str, last_name: str, username: str):
+        """
+        Запоминает новый профиль в кэше и ставит его запись в БД в очередь.
+        """
+        self.put(chat_id, entry._replace(fingerprint=profile_fingerprint(first_name, last_name, username)))
+        self._profiles.put(chat_id, (entry.pk, first_name, last_name, username))
+
+    @staticmethod
+    def _flush_profiles(items: dict[int, tuple]):
+        users = [
+            TelegramUser(pk=pk, chat_id=chat_id, first_name=first_name, last_name=last_name, username=username)
+            for chat_id, (pk, first_name, last_name, username) in items.items()
+        ]
+        TelegramUser.objects.bulk_update(users, _PROFILE_FIELDS, batch_size=500)
+        logger.info(f"UserCache: обновлены профили {len(users)} пользователей")
+
+    @staticmethod
+    def build_user(chat_id: int, entry: UserEntry, first_name: str, last_name: str, username: str) -> TelegramUser:
+        """
+        TelegramUser из кэша без запроса в БД. Без запроса читаются только
+        поля _LOADED_FIELDS (id, chat_id, first_name, last_name, username, blocked);
+        каждое из остальных полей (is_admin, admin_signature, ...) при первом
+        обращении загружается отдельным SELECT. Коду, которому они нужны,
+        следует сначала вызвать load_deferred(user) — один запрос на все поля.
+        """
+        return TelegramUser.from_db(
+            "default", _LOADED_FIELDS,
+            (entry.pk, chat_id, first_name, last_name, username, entry.blocked),
+        )
+
+
+def load_deferred(user: TelegramUser) -> TelegramUser:
+    """
+    Догружает одним запросом поля, отложенные в UserCache.build_user.
+    Поля из кэша не перечитываются: запись профиля может ещё ждать в буфере.
+    """
+    deferred = user.get_deferred_fields()
+    if deferred:
+        user.refresh_from_db(fields=list(deferred))
+    return user
+
+
+user_cache = UserCache()
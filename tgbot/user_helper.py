@@ -4,6 +4,7 @@ from tgbot.models import Configuration
 from pathlib import Path
 from loguru import logger
 from tgbot.dispatcher import get_main_bot
+from tgbot.user_cache import profile_fingerprint, user_cache
 
 Path("logs").mkdir(parents=True, exist_ok=True)
 
@@ -16,6 +17,11 @@ def sync_user_data(update: Message | CallbackQuery | TelegramUser) -> tuple[Tele
     на основании приходящего Message или CallbackQuery.
     Возвращает кортеж (user, created) или None, если не удалось получить chat_id
     или если это групповой чат.
+
+    Для Message/CallbackQuery сначала смотрим UserCache: известный пользователь
+    собирается без запроса в БД, а изменившийся профиль записывается отложенно.
+    У такого пользователя загружены только поля из кэша (см. UserCache.build_user);
+    остальные поля догружает load_deferred.
     """
     # 1) Определяем chat и chat_id
     if isinstance(update, Message):
@@ -38,7 +44,19 @@ def sync_user_data(update: Message | CallbackQuery | TelegramUser) -> tuple[Tele
     
     chat_id = chat.id
     first_name = chat.first_name or chat.title or ""
-    # 3) Получаем или создаем пользователя
+    last_name = chat.last_name or ""
+    username = chat.username or ""
+
+    # 3) Быстрый путь: пользователь уже в кэше
+    if not isinstance(update, TelegramUser):
+        entry = user_cache.get(chat_id)
+        if entry is not None:
+            if entry.fingerprint != profile_fingerprint(first_name, last_name, username):
+                user_cache.update_profile(chat_id, entry, first_name, last_name, username)
+                logger.info(f"sync_user_data: профиль TelegramUser {chat_id} изменился, запись отложена")
+            return user_cache.build_user(chat_id, entry, first_name, last_name, username), False
+
+    # 4) Получаем или создаем пользователя
     user, created = TelegramUser.objects.get_or_create(
         chat_id=chat_id,
         defaults={
@@ -48,7 +66,7 @@ def sync_user_data(update: Message | CallbackQuery | TelegramUser) -> tuple[Tele
         }
     )
 
-    # 4) При необходимости обновляем изменившиеся поля
+    # 5) При необходимости обновляем изменившиеся поля
     changed = False
     if user.first_name != (first_name):
         user.first_name = first_name
@@ -69,6 +87,7 @@ def sync_user_data(update: Message | CallbackQuery | TelegramUser) -> tuple[Tele
     else:
         logger.info(f"sync_user_data: No changes for TelegramUser {user.chat_id}")
 
+    user_cache.put_user(user)
     return user, created
 
 def is_group_chat(obj: Message | CallbackQuery) -> bool:
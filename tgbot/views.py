@@ -1,9 +1,9 @@
 from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse, HttpResponseBadRequest
-from telebot import types
 from tgbot.bot_instances import bots
+from tgbot.update_filter import JSONDecodeError, loads, prefilter
+from tgbot.update_workers import update_workers
 from django.shortcuts import render
-import json
 
 from pathlib import Path
 from loguru import logger
@@ -17,10 +17,14 @@ def home(request):
     return render(request, 'index.html')
 
 @csrf_exempt
-def telegram_webhook(request, hook_id):
+async def telegram_webhook(request, hook_id):
     """
     Обрабатывает POST от Telegram:
     - hook_id: число в URL, по которому ищем нужный TeleBot в instances
+
+    Апдейт только проверяется по сырому JSON и ставится в очередь
+    UpdateWorkerPool — ответ Telegram уходит сразу, не дожидаясь handlers.
+    Объекты telebot строятся уже в пуле и только для апдейтов, прошедших prefilter.
     """
     # 1) Найти бот по переданному ID
     try:
@@ -36,24 +40,28 @@ def telegram_webhook(request, hook_id):
 
     # 3) Распарсить JSON
     try:
-        payload = json.loads(request.body)
-    except json.JSONDecodeError as e:
+        payload = loads(request.body)
+    except JSONDecodeError as e:
         logger.error(f"Webhook({hook_id}): невалидный JSON: {e}")
         return HttpResponseBadRequest("Invalid JSON")
 
-    # 4) Превратить dict в Update
-    try:
-        update = types.Update.de_json(payload)
-    except Exception as e:
-        logger.exception(f"Webhook({hook_id}): ошибка разбора Update: {e}")
+    if not isinstance(payload, dict) or not isinstance(payload.get("update_id"), int):
+        logger.error(f"Webhook({hook_id}): в апдейте нет update_id")
         return HttpResponseBadRequest("Invalid update")
 
-    # 5) Передать апдейт в TeleBot
+    # 4) Отбросить апдейты, которые всё равно не дойдут до handlers
     try:
-        bot.process_new_updates([update])
+        reason = prefilter(bot, payload)
     except Exception as e:
-        logger.exception(f"Webhook({hook_id}): ошибка обработки апдейта: {e}")
-        # всё равно возвращаем 200, чтобы Telegram не пытался резендить бесконечно
+        logger.exception(f"Webhook({hook_id}): ошибка разбора Update: {e}")
+        return HttpResponseBadRequest("Invalid update")
+    if reason is not None:
+        logger.debug(f"Webhook({hook_id}): update {payload['update_id']} пропущен: {reason}")
         return HttpResponse("OK")
 
-    return HttpResponse("OK")
\ No newline at end of file
+    # 5) Передать апдейт в фоновую обработку
+    if not update_workers.submit(bot, payload):
+        # очередь переполнена — Telegram повторит доставку позже
+        return HttpResponse("Busy", status=503)
+
+    return HttpResponse("OK")
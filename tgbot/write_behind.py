@@ -0,0 +1,105 @@
+import atexit
+import threading
+import time
+from collections import deque
+
+from django.db import close_old_connections
+from loguru import logger
+
+from tgbot.logics.constants import Constants
+
+
+class WriteBehindBuffer:
+    """
+    Буфер отложенной записи в БД.
+
+    put(key, value) копит изменения (для одного ключа побеждает последнее),
+    фоновый поток раз в interval секунд отдаёт накопленное одной пачкой
+    в flush_fn(dict). flush() можно вызвать и вручную — например, перед
+    чтением, которому нужны все записи. stop() останавливает поток
+    и сбрасывает остаток; при выходе процесса он вызывается автоматически.
+
+    Если пачка не записалась, ключи пишутся по одному, чтобы один плохой
+    ключ не держал остальные. Ключ, не записанный WRITE_BEHIND_MAX_ATTEMPTS
+    раз подряд, убирается из буфера в dead_letters.
+    """
+
+    def __init__(self, name: str, flush_fn, interval: float):
+        self.name = name
+        self._flush_fn = flush_fn
+        self._interval = interval
+        self._lock = threading.Lock()
+        # сериализует сами сбросы, чтобы пачки не обгоняли друг друга
+        self._flush_lock = threading.Lock()
+        self._items: dict = {}
+        # key -> число неудачных попыток записи подряд
+        self._attempts: dict = {}
+        self.dead_letters: deque = deque(maxlen=Constants.WRITE_BEHIND_DEAD_LETTERS_MAX)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name=f"WriteBehind-{name}")
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Останавливает фоновый поток и записывает всё накопленное."""
+        self._stop.set()
+        self.flush()
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+
+    def discard(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def pending(self, key, default=None):
+        with self._lock:
+            return self._items.get(key, default)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                items, self._items = self._items, {}
+            if not items:
+                return
+            try:
+                self._flush_fn(items)
+                logger.debug(f"WriteBehindBuffer[{self.name}]: записано {len(items)}")
+            except Exception as e:
+                logger.warning(f"WriteBehindBuffer[{self.name}]: пачка из {len(items)} не записалась: {e}")
+                failed = items if len(items) == 1 else self._flush_each(items)
+            else:
+                failed = {}
+            self._settle(items, failed)
+
+    def _flush_each(self, items: dict) -> dict:
+        failed = {}
+        for key, value in items.items():
+            try:
+                self._flush_fn({key: value})
+            except Exception as e:
+                logger.warning(f"WriteBehindBuffer[{self.name}]: не записан {key!r}: {e}")
+                failed[key] = value
+        return failed
+
+    def _settle(self, items: dict, failed: dict):
+        with self._lock:
+            for key in items:
+                if key not in failed:
+                    self._attempts.pop(key, None)
+            for key, value in failed.items():
+                attempts = self._attempts.get(key, 0) + 1
+                if attempts >= Constants.WRITE_BEHIND_MAX_ATTEMPTS:
+                    self._attempts.pop(key, None)
+                    self.dead_letters.append({"key": key, "value": value, "failed_at": time.time()})
+                    logger.error(f"WriteBehindBuffer[{self.name}]: {key!r} отброшен после {attempts} попыток")
+                    continue
+                self._attempts[key] = attempts
+                # более свежие значения, пришедшие во время записи, не затираем
+                self._items.setdefault(key, value)
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            close_old_connections()
+            self.flush()